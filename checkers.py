@@ -0,0 +1,233 @@
+import importlib
+import json
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from dotenv import load_dotenv
+import events
+
+load_dotenv()
+
+# Способы сравнения ответа команды с task.answer. Проверка возвращает True/False,
+# либо None — "решить не удалось", тогда решение остаётся модератору.
+MANUAL = "manual"
+MODES = ("manual", "exact", "normalized", "numeric", "regex", "custom")
+CHECKERS_MODULE = os.getenv("GRADING_CHECKERS_MODULE")   # модуль со своими проверками, регистрируется при импорте
+CHECKER_CACHE_SIZE = int(os.getenv("CHECKER_CACHE_SIZE", 10000))   # задач со скомпилированной проверкой
+INVALIDATION_CHANNEL = "task_checker_invalidate"
+
+_custom = {}   # имя -> checker(expected, answer, options)
+
+
+class CheckSpecError(ValueError):
+    pass
+
+
+def register_checker(name):
+    # @register_checker("anagram") — затем у задачи check_mode="custom", check_options={"checker": "anagram"}
+    def decorator(func):
+        _custom[name] = func
+        return func
+    return decorator
+
+
+def custom_checkers():
+    return sorted(_custom)
+
+
+def normalize(value):
+    value = unicodedata.normalize("NFKC", value).casefold().replace("ё", "е")
+    return " ".join(value.split())
+
+
+def parse_number(value):
+    try:
+        return float(value.strip().replace(" ", "").replace(",", "."))
+    except ValueError:
+        return None
+
+
+class CompiledChecker:
+    # Спецификация проверки задачи, разобранная один раз: нормализованный ответ,
+    # скомпилированный шаблон, разобранное число. check_many проверяет пачку ответов сразу.
+    def __init__(self, mode, expected, options):
+        self.mode = mode
+        self.options = options
+        self._expected = expected
+        if mode not in MODES:
+            raise CheckSpecError(f"Unknown check mode: {mode}")
+        if mode == "exact":
+            self._target = expected.strip()
+        elif mode == "normalized":
+            self._target = normalize(expected)
+        elif mode == "numeric":
+            self._target = parse_number(expected)
+            if self._target is None:
+                raise CheckSpecError("Task answer is not a number")
+            try:
+                tolerance = float(options.get("tolerance", 0))
+            except (TypeError, ValueError):
+                raise CheckSpecError("'tolerance' must be a number")
+            self._tolerance = tolerance * abs(self._target) if options.get("relative") else tolerance
+        elif mode == "regex":
+            flags = re.IGNORECASE if options.get("ignore_case", True) else 0
+            try:
+                self._pattern = re.compile(options.get("pattern", expected), flags)
+            except re.error as e:
+                raise CheckSpecError(f"Invalid regex: {e}")
+        elif mode == "custom":
+            self._func = _custom.get(options.get("checker"))
+            if self._func is None:
+                raise CheckSpecError(f"Unknown custom checker: {options.get('checker')}")
+
+    def check_many(self, answers):
+        mode = self.mode
+        if mode == "exact":
+            target = self._target
+            return [a.strip() == target for a in answers]
+        if mode == "normalized":
+            target = self._target
+            return [normalize(a) == target for a in answers]
+        if mode == "numeric":
+            target, tolerance = self._target, self._tolerance
+            values = [parse_number(a) for a in answers]
+            return [v is not None and abs(v - target) <= tolerance for v in values]
+        if mode == "regex":
+            fullmatch = self._pattern.fullmatch
+            return [fullmatch(a.strip()) is not None for a in answers]
+        if mode == "custom":
+            return [self._custom(a) for a in answers]
+        return [None] * len(answers)
+
+    def check(self, answer):
+        return self.check_many([answer])[0]
+
+    def _custom(self, answer):
+        try:
+            return self._func(self._expected, answer, self.options)
+        except Exception:
+            # Упавшая пользовательская проверка — пусть решает модератор
+            return None
+
+
+MANUAL_CHECKER = CompiledChecker(MANUAL, "", {})
+
+
+def validate_spec(mode, options, expected):
+    # Для админских ручек: ошибку в настройке лучше показать сразу, а не молча оставить решения модератору
+    CompiledChecker(mode, expected, options)
+
+
+class CheckerRegistry:
+    # Скомпилированные проверки по task_id; сбрасываются при изменении и удалении задач
+    # (локально и на других воркерах через events). Новые задачи в кеш не попадают,
+    # пока по ним не придёт первое решение, поэтому load_task сбрасывать нечего.
+    def __init__(self, max_size=CHECKER_CACHE_SIZE):
+        self.max_size = max_size
+        self.enabled = True
+        self._entries = OrderedDict()   # task_id -> CompiledChecker
+        self._generation = 0            # растёт при каждом сбросе
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "compile_errors": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def _compile(self, mode, expected, options):
+        try:
+            return CompiledChecker(mode, expected, json.loads(options) if isinstance(options, str) else options)
+        except (CheckSpecError, ValueError):
+            # Настройка задачи испорчена в обход API — решения остаются модератору
+            self._stats["compile_errors"] += 1
+            return MANUAL_CHECKER
+
+    async def get_many(self, conn, task_ids):
+        result = {}
+        missing = []
+        for task_id in task_ids:
+            checker = self._entries.get(task_id) if self.enabled else None
+            if checker is None:
+                missing.append(task_id)
+            else:
+                self._entries.move_to_end(task_id)
+                result[task_id] = checker
+        self._stats["hits"] += len(result)
+        self._stats["misses"] += len(missing)
+        if missing:
+            generation = self._generation
+            rows = await conn.fetch(
+                "SELECT task_id, check_mode, answer, check_options FROM task WHERE task_id = ANY($1::bigint[])",
+                missing
+            )
+            for task_id, mode, expected, options in rows:
+                checker = result[task_id] = self._compile(mode, expected, options)
+                # Если пока шёл запрос задачу сбросили, прочитанное могло уже устареть — не кешируем
+                if self.enabled and self.max_size > 0 and generation == self._generation:
+                    self._entries[task_id] = checker
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return result
+
+    def invalidate(self, task_id):
+        self._generation += 1
+        if self._entries.pop(task_id, None) is not None:
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        self._generation += 1
+        self._stats["invalidations"] += len(self._entries)
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            **self._stats,
+        }
+
+
+registry = CheckerRegistry()
+
+
+def _on_invalidate(message):
+    if "task_id" in message:
+        registry.invalidate(message["task_id"])
+    else:
+        registry.clear()
+
+
+async def invalidate_task(conn, task_id):
+    registry.invalidate(task_id)
+    await events.publish(conn, INVALIDATION_CHANNEL, {"task_id": task_id})
+
+
+async def invalidate_all(conn):
+    registry.clear()
+    await events.publish(conn, INVALIDATION_CHANNEL, {})
+
+
+def _on_connect():
+    registry.clear()
+    registry.enabled = True
+
+
+def _on_disconnect():
+    # Без канала инвалидации кеш может разойтись с другими воркерами
+    registry.enabled = False
+    registry.clear()
+
+
+events.subscribe(INVALIDATION_CHANNEL, _on_invalidate)
+if events.EVENTS_ENABLED:
+    registry.enabled = False
+    events.on_connect(_on_connect)
+    events.on_disconnect(_on_disconnect)
+
+
+if CHECKERS_MODULE:
+    importlib.import_module(CHECKERS_MODULE)
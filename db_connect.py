@@ -1,9 +1,22 @@
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
+import asyncpg
 import psycopg2
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Настройки пула соединений
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))              # ожидание свободного соединения, сек
+POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", 1800))  # пересоздание "старых" соединений, сек
+POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", 300))           # закрытие лишних простаивающих соединений, сек
+POOL_CHECK_IDLE = float(os.getenv("DB_POOL_CHECK_IDLE", 30))        # после такого простоя соединение пингуется при выдаче, сек
+
+
 def get_connection():
     return psycopg2.connect(
         dbname=os.getenv("POSTGRES_DB"),
@@ -11,4 +24,182 @@ def get_connection():
         password=os.getenv("POSTGRES_PASSWORD"),
         host=os.getenv("POSTGRES_HOST", "localhost"),
         port=os.getenv("POSTGRES_PORT", "5432")
-    )
\ No newline at end of file
+    )
+
+
+def async_connect_params():
+    return {
+        "database": os.getenv("POSTGRES_DB"),
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        "host": os.getenv("POSTGRES_HOST", "localhost"),
+        "port": int(os.getenv("POSTGRES_PORT", "5432")),
+    }
+
+
+async def get_async_connection():
+    # Отдельное соединение вне пула: для LISTEN и других долгоживущих задач
+    return await asyncpg.connect(**async_connect_params())
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    # Наследуемся от OperationalError, чтобы роутеры отвечали 503, как при недоступной БД
+    pass
+
+
+class AsyncConnectionPool:
+    # Обёртка над asyncpg.Pool: таймаут выдачи, проверка и пересоздание соединений, статистика
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 max_lifetime=POOL_MAX_LIFETIME, max_idle=POOL_MAX_IDLE, check_idle=POOL_CHECK_IDLE):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_idle = check_idle
+        self._pool = None
+        self._lock = asyncio.Lock()
+        self._created = {}     # pid бэкенда -> время создания
+        self._released = {}    # pid бэкенда -> время возврата в пул
+        self._waiting = 0
+        self._stats = {
+            "acquired": 0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_checks": 0,
+            "peak_in_use": 0,
+            "wait_seconds": 0.0,
+        }
+
+    async def _init(self, conn):
+        now = time.monotonic()
+        if len(self._created) > 4 * self.max_size:
+            # Забываем бэкенды, которые пул уже должен был закрыть
+            for pid in [pid for pid, created in self._created.items() if now - created > self.max_lifetime]:
+                self._created.pop(pid, None)
+                self._released.pop(pid, None)
+        self._created[conn.get_server_pid()] = now
+        self._stats["created"] += 1
+
+    async def open(self):
+        async with self._lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    **async_connect_params(),
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    max_inactive_connection_lifetime=self.max_idle,
+                    init=self._init,
+                )
+        return self._pool
+
+    async def close(self):
+        async with self._lock:
+            if self._pool is not None:
+                await self._pool.close()
+                self._pool = None
+
+    async def _is_usable(self, conn):
+        pid = conn.get_server_pid()
+        now = time.monotonic()
+        if now - self._created.get(pid, now) > self.max_lifetime:
+            self._stats["recycled"] += 1
+            return False
+        if now - self._released.get(pid, now) > self.check_idle:
+            try:
+                await conn.execute("SELECT 1")
+            except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError):
+                self._stats["failed_checks"] += 1
+                return False
+        return True
+
+    async def acquire(self, timeout=None):
+        pool = self._pool or await self.open()
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        while True:
+            remaining = started + timeout - time.monotonic()
+            self._waiting += 1
+            try:
+                conn = await pool.acquire(timeout=max(remaining, 0))
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                raise PoolTimeout(f"Timed out after {timeout:.1f}s waiting for a database connection")
+            finally:
+                self._waiting -= 1
+            if await self._is_usable(conn):
+                break
+            # Закрытое соединение asyncpg пересоздаст при следующей выдаче
+            self._forget(conn)
+            conn.terminate()
+            await pool.release(conn)
+        self._stats["acquired"] += 1
+        self._stats["wait_seconds"] += time.monotonic() - started
+        in_use = pool.get_size() - pool.get_idle_size()
+        self._stats["peak_in_use"] = max(self._stats["peak_in_use"], in_use)
+        return conn
+
+    def _forget(self, conn):
+        pid = conn.get_server_pid()
+        self._created.pop(pid, None)
+        self._released.pop(pid, None)
+
+    async def release(self, conn):
+        if not conn.is_closed():
+            self._released[conn.get_server_pid()] = time.monotonic()
+        await self._pool.release(conn)
+
+    def stats(self):
+        size = self._pool.get_size() if self._pool else 0
+        idle = self._pool.get_idle_size() if self._pool else 0
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "waiting": self._waiting,
+            "saturation": round((size - idle) / self.max_size, 3),
+            **self._stats,
+            "wait_seconds": round(self._stats["wait_seconds"], 3),
+        }
+
+
+_pool = AsyncConnectionPool()
+
+
+def get_pool():
+    return _pool
+
+
+async def open_pool():
+    await _pool.open()
+
+
+async def close_pool():
+    await _pool.close()
+
+
+@asynccontextmanager
+async def connection(timeout=None):
+    conn = await _pool.acquire(timeout)
+    try:
+        yield conn
+    finally:
+        await _pool.release(conn)
+
+
+def pool_stats():
+    return _pool.stats()
+
+
+# Ошибки, при которых роутеры отвечают 503 "Database unavailable"
+DB_UNAVAILABLE_ERRORS = (
+    psycopg2.OperationalError,
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.TooManyConnectionsError,
+)
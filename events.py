@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import uuid
+from dotenv import load_dotenv
+from db_connect import get_async_connection
+
+load_dotenv()
+
+# Общая шина событий между воркерами поверх PostgreSQL LISTEN/NOTIFY.
+# Каждый процесс держит одно слушающее соединение на все каналы.
+EVENTS_ENABLED = os.getenv("EVENTS_NOTIFY", "1") == "1"
+RECONNECT_DELAY = 5
+WORKER_ID = uuid.uuid4().hex[:12]
+
+_handlers = {}          # канал -> [handler(message)]
+_connect_hooks = []     # вызываются после (пере)подключения слушателя
+_disconnect_hooks = []  # вызываются при потере слушателя
+_listener_task = None
+connected = False
+
+
+def subscribe(channel, handler):
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def on_connect(hook):
+    _connect_hooks.append(hook)
+
+
+def on_disconnect(hook):
+    _disconnect_hooks.append(hook)
+
+
+async def publish(conn, channel, message):
+    # Локальные обработчики вызывает сам отправитель; другим воркерам сообщение придёт через NOTIFY.
+    # Внутри транзакции уведомление уйдёт только после COMMIT.
+    if EVENTS_ENABLED:
+        payload = json.dumps({"worker": WORKER_ID, **message}, ensure_ascii=False, default=str)
+        await conn.execute("SELECT pg_notify($1, $2)", channel, payload)
+
+
+def _dispatch(conn, pid, channel, payload):
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        return
+    if message.pop("worker", None) == WORKER_ID:
+        return
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(message)
+        except Exception:
+            pass
+
+
+async def _run_hooks(hooks):
+    for hook in hooks:
+        try:
+            result = hook()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            pass
+
+
+async def _listen():
+    global connected
+    while True:
+        conn = None
+        try:
+            conn = await get_async_connection()
+            terminated = asyncio.Event()
+            conn.add_termination_listener(lambda _: terminated.set())
+            for channel in _handlers:
+                await conn.add_listener(channel, _dispatch)
+            connected = True
+            # Пока слушателя не было, уведомления могли потеряться
+            await _run_hooks(_connect_hooks)
+            await terminated.wait()
+        except asyncio.CancelledError:
+            connected = False
+            if conn is not None:
+                await conn.close()
+            raise
+        except Exception:
+            pass
+        if connected:
+            connected = False
+            await _run_hooks(_disconnect_hooks)
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+def start():
+    global _listener_task
+    if EVENTS_ENABLED and _listener_task is None:
+        _listener_task = asyncio.create_task(_listen())
+
+
+async def stop():
+    global _listener_task, connected
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+        connected = False
@@ -0,0 +1,48 @@
+import json
+from datetime import date, datetime
+from typing import Literal
+from fastapi import Query
+from fastapi.responses import JSONResponse
+
+# Сериализация больших ответов. Строки из БД не превращаются по одной в dict с .isoformat():
+# datetime кодирует сам сериализатор, а с ?shape=columns строки отдаются как есть —
+# {"columns": [...], "rows": [[...], ...]}, без ключей в каждой записи.
+# orjson (если установлен) в разы быстрее stdlib json; без него ответ тот же, просто медленнее.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SHAPES = ("objects", "columns")
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    # -> bytes, тот же JSON, что у JSONResponse
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps(content)
+
+
+def rows_content(columns, rows, shape="objects"):
+    # rows — записи asyncpg или кортежи в порядке columns
+    if shape == "columns":
+        return {"columns": columns, "rows": [tuple(row) for row in rows]}
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def shape_param(
+    shape: Literal["objects", "columns"] = Query("objects", description="columns — {columns, rows} без ключей в каждой строке")
+):
+    return shape
@@ -55,6 +55,27 @@ export default {
     return res.data;
   },
 
+  async moderateSolutions(action, pairs) {
+    const token = localStorage.getItem("token");
+    const res = await apiClient.post(
+      "/admin/tasks/answers/moderate",
+      {
+        action,
+        pairs: pairs.map(([teamId, taskId]) => ({
+          team_id: teamId,
+          task_id: taskId,
+        })),
+      },
+      {
+        headers: {
+          Authorization: `Bearer ${token}`,
+          "Content-Type": "application/json",
+        },
+      }
+    );
+    return res.data;
+  },
+
   async createTask(task) {
     const token = localStorage.getItem("token");
     const res = await apiClient.post("/admin/tasks/load", task, {
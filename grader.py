@@ -0,0 +1,187 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import checkers
+import scoreboard
+from db_connect import connection
+
+load_dotenv()
+
+# Автопроверка решений вне обработчика запроса: answer_load кладёт решение в ограниченную
+# очередь, цикл проверки забирает его пачками, сверяет ответы в пуле потоков и записывает
+# approve/reject одним UPDATE на пачку. То, что не влезло в очередь или осталось после
+# рестарта, подбирает периодический обход решений на проверке.
+GRADING_ENABLED = os.getenv("GRADING_ENABLED", "1") == "1"
+GRADING_QUEUE_SIZE = int(os.getenv("GRADING_QUEUE_SIZE", 10000))
+GRADING_BATCH = int(os.getenv("GRADING_BATCH", 500))
+GRADING_WORKERS = int(os.getenv("GRADING_WORKERS", 2))
+GRADING_FLUSH_INTERVAL = float(os.getenv("GRADING_FLUSH_INTERVAL", 0.2))   # сек ожидания добора пачки
+GRADING_SWEEP_INTERVAL = float(os.getenv("GRADING_SWEEP_INTERVAL", 30))    # сек между обходами
+SWEEP_MIN_AGE = 10   # сек: свежие решения ещё в очереди, обход их не трогает
+NOTIFY_CHUNK = 250   # пар (team_id, task_id) в одном событии scoreboard
+
+
+def _grade(checkers_by_task, items):
+    # Выполняется в пуле потоков; ответы одной задачи проверяются одним вызовом check_many.
+    # Возвращает [(solution_id, condition)] для решённых
+    by_task = {}
+    for solution_id, task_id, answer in items:
+        by_task.setdefault(task_id, []).append((solution_id, answer))
+    results = []
+    for task_id, solutions in by_task.items():
+        checker = checkers_by_task.get(task_id)
+        if checker is None or checker.mode == checkers.MANUAL:
+            continue
+        verdicts = checker.check_many([answer for _, answer in solutions])
+        for (solution_id, _), verdict in zip(solutions, verdicts):
+            if verdict is not None:
+                results.append((solution_id, "approve" if verdict else "reject"))
+    return results
+
+
+class Grader:
+    def __init__(self):
+        self._queue = asyncio.Queue(maxsize=GRADING_QUEUE_SIZE)
+        self._queued = set()        # solution_id в очереди — обход не добавит их повторно
+        self._executor = None
+        self._tasks = []
+        self.enqueued = 0
+        self.dropped = 0
+        self.approved = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.batches = 0
+        self.failed_batches = 0
+
+    def submit(self, solution_id, task_id, answer):
+        if not self._tasks or solution_id in self._queued:
+            return False
+        try:
+            self._queue.put_nowait((solution_id, task_id, answer))
+        except asyncio.QueueFull:
+            # Не страшно: решение останется на проверке, и его подберёт обход
+            self.dropped += 1
+            return False
+        self._queued.add(solution_id)
+        self.enqueued += 1
+        return True
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + GRADING_FLUSH_INTERVAL
+        while len(batch) < GRADING_BATCH:
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), max(deadline - loop.time(), 0)))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _process(self, batch):
+        loop = asyncio.get_running_loop()
+        async with connection() as conn:
+            task_checkers = await checkers.registry.get_many(conn, list({item[1] for item in batch}))
+            results = await loop.run_in_executor(self._executor, _grade, task_checkers, batch)
+            self.skipped += len(batch) - len(results)
+            if not results:
+                return
+            # Только решения, которые всё ещё на проверке: ручное решение модератора не перетираем
+            rows = await conn.fetch("""
+                UPDATE solution AS s
+                SET condition = v.condition,
+                    approved_at = CASE WHEN v.condition = 'approve' THEN NOW() END
+                FROM unnest($1::bigint[], $2::varchar[]) AS v(solution_id, condition)
+                WHERE s.solution_id = v.solution_id AND s.condition = 'verification'
+                RETURNING s.team_id, s.task_id, s.condition
+            """, [r[0] for r in results], [r[1] for r in results])
+            for condition in ("approve", "reject"):
+                pairs = [(r[0], r[1]) for r in rows if r[2] == condition]
+                if condition == "approve":
+                    self.approved += len(pairs)
+                else:
+                    self.rejected += len(pairs)
+                for i in range(0, len(pairs), NOTIFY_CHUNK):
+                    await scoreboard.record(conn, {
+                        "type": "conditions",
+                        "condition": condition,
+                        "pairs": pairs[i:i + NOTIFY_CHUNK]
+                    })
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._process(batch)
+                self.batches += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # БД недоступна или пачка не записалась — решения остались на проверке, их вернёт обход
+                self.failed_batches += 1
+            finally:
+                for item in batch:
+                    self._queued.discard(item[0])
+
+    async def sweep(self):
+        free = GRADING_QUEUE_SIZE - self._queue.qsize()
+        if free <= 0:
+            return 0
+        async with connection() as conn:
+            rows = await conn.fetch("""
+                SELECT s.solution_id, s.task_id, s.answer
+                FROM solution s
+                JOIN task t ON t.task_id = s.task_id
+                WHERE s.condition = 'verification' AND t.check_mode <> 'manual'
+                  AND s.sent_at < NOW() - make_interval(secs => $1)
+                ORDER BY s.solution_id
+                LIMIT $2
+            """, SWEEP_MIN_AGE, free)
+        return sum(self.submit(*row) for row in rows)
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            await asyncio.sleep(GRADING_SWEEP_INTERVAL)
+
+    def start(self):
+        if not GRADING_ENABLED or self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=GRADING_WORKERS, thread_name_prefix="grader")
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._sweep_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "enabled": bool(self._tasks),
+            "queued": self._queue.qsize(),
+            "queue_size": GRADING_QUEUE_SIZE,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "approved": self.approved,
+            "rejected": self.rejected,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "checkers": checkers.registry.stats(),
+        }
+
+
+grader = Grader()
@@ -0,0 +1,234 @@
+import asyncio
+import bisect
+import os
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+import scoreboard
+from scoreboard import board
+from db_connect import connection
+
+load_dotenv()
+
+# Рейтинг команд. Очки — сумма task.points зачтённых задач плюс бонус первой команде,
+# решившей задачу (по sent_at). При равных очках выше та, у кого меньше штраф — сумма минут
+# от начала конкурса до отправки каждого зачтённого решения (как в ICPC; время модерации
+# команде не засчитывается), затем та, кто раньше отправил последнее зачтённое решение.
+# Состояние строится из scoreboard.board и дальше обновляется теми же событиями; команды
+# хранятся в отсортированном списке ключей, поэтому место команды ищется бинарным поиском.
+#
+# Заморозка: с CONTEST_END - LEADERBOARD_FREEZE публичный рейтинг учитывает только решения,
+# отправленные до момента заморозки; полный рейтинг видит администратор (?live=true).
+CONTEST_START = os.getenv("CONTEST_START")          # ISO 8601; без него — первая отправка конкурса
+CONTEST_END = os.getenv("CONTEST_END")              # ISO 8601; без него заморозки нет
+LEADERBOARD_FREEZE = float(os.getenv("LEADERBOARD_FREEZE", 60))         # минут до конца
+FIRST_BLOOD_BONUS = int(os.getenv("LEADERBOARD_FIRST_BLOOD_BONUS", 0))  # очков за первое решение задачи
+ADMIN_LOGIN = "admin"
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def freeze_at():
+    end = _parse_time(CONTEST_END)
+    if end is None or LEADERBOARD_FREEZE <= 0:
+        return None
+    return end - timedelta(minutes=LEADERBOARD_FREEZE)
+
+
+class Standings:
+    def __init__(self, cutoff=None):
+        self.cutoff = cutoff       # решения, отправленные не раньше, не учитываются
+        self._reset({}, None)
+
+    def _reset(self, weights, start):
+        self.weights = weights     # task_id -> points
+        self.start = start         # от этого момента считается штраф
+        self.solved = {}           # team_id -> {task_id: sent_at} зачтённых решений
+        self.first = {}            # task_id -> (sent_at, team_id) первого зачтённого
+        self.entries = {}          # team_id -> ключ в self.keys
+        self.keys = []             # отсортированы: (-очки, штраф, последнее решение, team_id)
+
+    def _counts(self, condition, sent_at):
+        return condition == "approve" and (self.cutoff is None or sent_at < self.cutoff)
+
+    def build(self, weights, start):
+        self._reset(weights, start)
+        # Администратор — запись в teams, но не участник
+        team_ids = [team_id for team_id in board.team_ids if board.logins.get(team_id) != ADMIN_LOGIN]
+        for team_id in team_ids:
+            solved = {}
+            for task_id, (condition, sent_at) in board.cells.get(team_id, {}).items():
+                if task_id in weights and self._counts(condition, sent_at):
+                    solved[task_id] = sent_at
+                    if task_id not in self.first or (sent_at, team_id) < self.first[task_id]:
+                        self.first[task_id] = (sent_at, team_id)
+            self.solved[team_id] = solved
+        for team_id in team_ids:
+            self._place(team_id)
+
+    def _key(self, team_id):
+        solved = self.solved.get(team_id, {})
+        score = sum(self.weights.get(task_id, 0) for task_id in solved)
+        score += FIRST_BLOOD_BONUS * sum(1 for task_id in solved if self.first.get(task_id, (None, None))[1] == team_id)
+        penalty = 0
+        last = 0.0
+        for sent_at in solved.values():
+            if self.start is not None:
+                penalty += max(int((sent_at - self.start).total_seconds() // 60), 0)
+            last = max(last, sent_at.timestamp())
+        return (-score, penalty, last, team_id)
+
+    def _place(self, team_id):
+        old = self.entries.pop(team_id, None)
+        if old is not None:
+            i = bisect.bisect_left(self.keys, old)
+            if i < len(self.keys) and self.keys[i] == old:
+                del self.keys[i]
+        key = self._key(team_id)
+        bisect.insort(self.keys, key)
+        self.entries[team_id] = key
+
+    def _recount_first(self, task_id):
+        best = None
+        for team_id, solved in self.solved.items():
+            if task_id in solved and (best is None or (solved[task_id], team_id) < best):
+                best = (solved[task_id], team_id)
+        if best is None:
+            self.first.pop(task_id, None)
+        else:
+            self.first[task_id] = best
+
+    def update(self, team_id, task_id):
+        # Решение (team_id, task_id) изменилось в board — пересчитываем только затронутые команды
+        if task_id not in self.weights or team_id not in self.entries:
+            return
+        cell = board.cells.get(team_id, {}).get(task_id)
+        if self.start is None and cell is not None:
+            # Рейтинг собран до первой отправки и CONTEST_START не задан: штраф считается от неё
+            self.start = cell[1]
+        solved = self.solved.setdefault(team_id, {})
+        counts = cell is not None and self._counts(*cell)
+        if counts == (task_id in solved) and (not counts or solved[task_id] == cell[1]):
+            return
+        old_first = self.first.get(task_id, (None, None))[1]
+        if counts:
+            solved[task_id] = cell[1]
+            if old_first is None or (cell[1], team_id) < self.first[task_id]:
+                self.first[task_id] = (cell[1], team_id)
+        else:
+            del solved[task_id]
+            if old_first == team_id:
+                self._recount_first(task_id)
+        self._place(team_id)
+        new_first = self.first.get(task_id, (None, None))[1]
+        if FIRST_BLOOD_BONUS and old_first not in (None, team_id, new_first):
+            self._place(old_first)
+        if FIRST_BLOOD_BONUS and new_first not in (None, team_id, old_first):
+            self._place(new_first)
+
+    def rank(self, team_id):
+        # Равные очки, штраф и время последнего решения — одно место
+        key = self.entries.get(team_id)
+        if key is None:
+            return None
+        return bisect.bisect_left(self.keys, key[:3]) + 1
+
+    def row(self, team_id):
+        key = self.entries[team_id]
+        solved = self.solved.get(team_id, {})
+        return {
+            "rank": self.rank(team_id),
+            "team_name": board.logins.get(team_id),
+            "score": -key[0],
+            "solved": len(solved),
+            "penalty": key[1],
+            "first_bloods": sum(1 for task_id in solved if self.first.get(task_id, (None, None))[1] == team_id),
+        }
+
+    def top(self, limit=None):
+        keys = self.keys if limit is None else self.keys[:limit]
+        return [self.row(key[3]) for key in keys]
+
+
+class Leaderboard:
+    def __init__(self):
+        self.ready = False
+        self._lock = asyncio.Lock()
+        self._generation = 0       # растёт при каждой инвалидации, пока идёт сборка
+        self.freeze_at = freeze_at()
+        self.live = Standings()
+        self.frozen = Standings(cutoff=self.freeze_at) if self.freeze_at else None
+        self.rebuilds = 0
+
+    def invalidate(self):
+        self.ready = False
+        self._generation += 1
+
+    def is_frozen(self):
+        return self.frozen is not None and datetime.now(timezone.utc) >= self.freeze_at
+
+    async def ensure_ready(self):
+        if self.ready:
+            return
+        async with self._lock:
+            if self.ready:
+                return
+            generation = self._generation
+            await board.ensure_loaded()
+            async with connection() as conn:
+                rows = await conn.fetch("SELECT task_id, points FROM task")
+            weights = dict(rows)
+            start = _parse_time(CONTEST_START)
+            if start is None:
+                sent = [sent_at for cells in board.cells.values() for _, sent_at in cells.values()]
+                start = min(sent) if sent else None
+            for standings in (self.live, self.frozen):
+                if standings is not None:
+                    standings.build(weights, start)
+            # Если за время запроса состав задач снова сменился, соберём ещё раз в следующий раз
+            self.ready = generation == self._generation
+            self.rebuilds += 1
+
+    def standings(self, live=False):
+        return self.live if live or not self.is_frozen() else self.frozen
+
+    def on_board_event(self, event):
+        if not self.ready:
+            return
+        kind = event["type"]
+        if kind in ("solution", "condition", "solution_removed"):
+            changes = [(event["team_id"], event["task_id"])]
+        elif kind == "conditions":
+            changes = event["pairs"]
+        elif kind in ("team", "task", "tasks", "task_removed", "tasks_cleared", "solutions_cleared"):
+            # Сменился состав команд или задач (и их веса) — пересоберём при следующем запросе
+            self.invalidate()
+            return
+        else:
+            return
+        for standings in (self.live, self.frozen):
+            if standings is not None:
+                for team_id, task_id in changes:
+                    standings.update(team_id, task_id)
+
+    def on_board_delta(self, delta):
+        if delta["type"] == "resync":
+            self.invalidate()
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "teams": len(self.live.keys),
+            "frozen": self.is_frozen(),
+            "freeze_at": self.freeze_at,
+            "rebuilds": self.rebuilds,
+        }
+
+
+leaderboard = Leaderboard()
+scoreboard.on_event(leaderboard.on_board_event)
+board.subscribe(leaderboard.on_board_delta)
@@ -1,16 +1,61 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+import psycopg2
+from db_connect import open_pool, close_pool
+import events
+import passwords
+import revocation
+from migrate import migrate, MIGRATE_ON_STARTUP
+from scoreboard import board
+from grader import grader
+from token_maintenance import sweeper as token_sweeper
+from presence import presence
 from routers import ping, auth
 from routers.admin.tasks import router as admin_tasks_router
 from routers.team.tasks import router as team_tasks_router
+from routers.team.ws_status import router as team_ws_router, hub as team_ws_hub
 from routers.dashboard import router as dashboard_router
+from routers.ws_dashboard import router as ws_dashboard_router, hub as dashboard_hub
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIGRATE_ON_STARTUP:
+        try:
+            await run_in_threadpool(migrate)
+        except psycopg2.OperationalError:
+            pass
+    # Прогреваем пул и состояние дашборда; если БД недоступна, всё поднимется при первых запросах
+    try:
+        await open_pool()
+        await presence.load()
+        await board.load()
+        await revocation.start()
+    except Exception:
+        pass
+    events.start()
+    grader.start()
+    token_sweeper.start()
+    presence.start()
+    yield
+    await presence.stop()
+    await token_sweeper.stop()
+    await grader.stop()
+    await dashboard_hub.stop()
+    await team_ws_hub.stop()
+    await events.stop()
+    await close_pool()
+    passwords.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(ping.router)
 app.include_router(auth.router)
 app.include_router(admin_tasks_router)
 app.include_router(team_tasks_router)
+app.include_router(team_ws_router)
 app.include_router(dashboard_router)
+app.include_router(ws_dashboard_router)
 
 @app.get("/", responses={
     200: {"description": "Server is running"},
@@ -0,0 +1,149 @@
+import argparse
+import os
+import re
+from dotenv import load_dotenv
+from db_connect import get_connection
+
+load_dotenv()
+
+# Версионированные миграции схемы: migrations/NNNN_name.sql применяются по порядку,
+# каждая в своей транзакции, и записываются в таблицу schema_migrations.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "1") == "1"
+MIGRATION_LOCK_ID = 7291001   # pg_advisory_lock: воркеры не мигрируют одновременно
+FILENAME_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+# Горячие запросы, которые обязаны обслуживаться индексом
+HOT_QUERIES = [
+    ("solution by team and task",
+     "SELECT solution_id, condition, answer, sent_at, approved_at FROM solution WHERE team_id = 1 AND task_id = 1"),
+    ("solutions by team",
+     "SELECT solution_id, task_id, condition, sent_at, approved_at FROM solution WHERE team_id = 1 ORDER BY task_id"),
+    ("solutions by task",
+     "SELECT solution_id, team_id, condition, sent_at, approved_at FROM solution WHERE task_id = 1 ORDER BY team_id"),
+    ("token lookup",
+     "SELECT expires_at FROM auth_tokens WHERE token = 'token' AND revoked_at IS NULL"),
+    ("last activity by team",
+     "SELECT team_id, MAX(sent_at) FROM solution GROUP BY team_id"),
+    ("solutions by condition",
+     "SELECT team_id, task_id FROM solution WHERE condition = 'verification' AND task_id = 1"),
+]
+
+
+def load_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = FILENAME_RE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding="utf-8") as f:
+            migrations.append((int(match.group(1)), match.group(2), f.read()))
+    return migrations
+
+
+def _applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS "schema_migrations" (
+            "version" integer NOT NULL,
+            "name" varchar(255) NOT NULL,
+            "applied_at" timestamp with time zone NOT NULL DEFAULT NOW(),
+            PRIMARY KEY ("version")
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    applied_now = []
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            applied = _applied_versions(cur)
+            conn.commit()
+            for version, name, sql in load_migrations():
+                if version in applied:
+                    continue
+                try:
+                    cur.execute(sql)
+                    cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                applied_now.append((version, name))
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+    return applied_now
+
+
+def status(conn):
+    cur = conn.cursor()
+    applied = _applied_versions(cur)
+    conn.commit()
+    return [(version, name, version in applied) for version, name, _ in load_migrations()]
+
+
+def _plan_indexes(plan, found):
+    if "Index Name" in plan:
+        found.append(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        _plan_indexes(child, found)
+    return found
+
+
+def check_indexes(conn):
+    # На маленьких таблицах планировщик честно выбирает seq scan, поэтому запрещаем его:
+    # если запрос всё равно не может пойти по индексу, значит подходящего индекса нет.
+    results = []
+    cur = conn.cursor()
+    try:
+        cur.execute("SET LOCAL enable_seqscan = off")
+        for name, query in HOT_QUERIES:
+            cur.execute("EXPLAIN (FORMAT JSON) " + query)
+            plan = cur.fetchone()[0][0]["Plan"]
+            indexes = _plan_indexes(plan, [])
+            results.append((name, bool(indexes), indexes))
+    finally:
+        conn.rollback()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--status", action="store_true", help="показать применённые и ожидающие миграции")
+    parser.add_argument("--check", action="store_true", help="проверить через EXPLAIN, что горячие запросы идут по индексам")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        if args.status:
+            for version, name, applied in status(conn):
+                print(f"{'✅' if applied else '⏳'} {version:04d}_{name}")
+            return 0
+        if args.check:
+            ok = True
+            for name, uses_index, indexes in check_indexes(conn):
+                ok = ok and uses_index
+                print(f"{'✅' if uses_index else '❌'} {name}: {', '.join(indexes) or 'seq scan'}")
+            return 0 if ok else 1
+        applied = migrate(conn)
+        for version, name in applied:
+            print(f"✅ {version:04d}_{name}")
+        if not applied:
+            print("➖ Схема актуальна")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,54 @@
+-- Исходная схема (как создавал toys/create_db.py)
+CREATE TABLE IF NOT EXISTS "auth_tokens" (
+    "token_id" bigint GENERATED BY DEFAULT AS IDENTITY,
+    "token" varchar(255) NOT NULL UNIQUE,
+    "expires_at" timestamp with time zone NOT NULL,
+    "team_id" bigint NOT NULL,
+    PRIMARY KEY ("token_id")
+);
+
+CREATE TABLE IF NOT EXISTS "solution" (
+    "solution_id" bigint GENERATED BY DEFAULT AS IDENTITY,
+    "condition" varchar(255) NOT NULL,
+    "answer" varchar(255) NOT NULL,
+    "sent_at" timestamp with time zone NOT NULL,
+    "approved_at" timestamp with time zone,
+    "team_id" bigint NOT NULL,
+    "task_id" bigint NOT NULL,
+    PRIMARY KEY ("solution_id")
+);
+
+CREATE TABLE IF NOT EXISTS "teams" (
+    "team_id" bigint GENERATED BY DEFAULT AS IDENTITY,
+    "updated_at" timestamp with time zone NOT NULL,
+    "login" varchar(255) NOT NULL UNIQUE,
+    "password_hash" varchar(255) NOT NULL,
+    "password_salt" varchar(255) NOT NULL,
+    "created_at" timestamp with time zone NOT NULL,
+    PRIMARY KEY ("team_id")
+);
+
+CREATE TABLE IF NOT EXISTS "task" (
+    "task_id" bigint GENERATED BY DEFAULT AS IDENTITY,
+    "answer" varchar(255) NOT NULL,
+    "qwestion" varchar(255) NOT NULL,
+    "created_at" timestamp with time zone NOT NULL,
+    PRIMARY KEY ("task_id")
+);
+
+-- Внешние ключи (база могла быть создана старым скриптом, поэтому проверяем наличие)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'auth_tokens_fk3') THEN
+        ALTER TABLE "auth_tokens"
+            ADD CONSTRAINT "auth_tokens_fk3" FOREIGN KEY ("team_id") REFERENCES "teams"("team_id");
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'solution_fk5') THEN
+        ALTER TABLE "solution"
+            ADD CONSTRAINT "solution_fk5" FOREIGN KEY ("team_id") REFERENCES "teams"("team_id");
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'solution_fk6') THEN
+        ALTER TABLE "solution"
+            ADD CONSTRAINT "solution_fk6" FOREIGN KEY ("task_id") REFERENCES "task"("task_id");
+    END IF;
+END $$;
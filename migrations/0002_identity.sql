@@ -0,0 +1,28 @@
+-- Перевод баз, созданных до появления identity, с SELECT MAX(id)+1 на идентификаторы PostgreSQL.
+-- Счётчик продолжает нумерацию после уже существующих строк.
+DO $$
+DECLARE
+    col record;
+BEGIN
+    FOR col IN
+        SELECT * FROM (VALUES
+            ('auth_tokens', 'token_id'),
+            ('solution', 'solution_id'),
+            ('teams', 'team_id'),
+            ('task', 'task_id')
+        ) AS t(table_name, column_name)
+    LOOP
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema()
+              AND table_name = col.table_name
+              AND column_name = col.column_name
+              AND is_identity = 'NO'
+        ) THEN
+            EXECUTE format('ALTER TABLE %I ALTER COLUMN %I ADD GENERATED BY DEFAULT AS IDENTITY',
+                           col.table_name, col.column_name);
+            EXECUTE format('SELECT setval(pg_get_serial_sequence(%L, %L), COALESCE((SELECT MAX(%I) FROM %I), 0) + 1, false)',
+                           col.table_name, col.column_name, col.column_name, col.table_name);
+        END IF;
+    END LOOP;
+END $$;
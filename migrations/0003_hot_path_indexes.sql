@@ -0,0 +1,19 @@
+-- Индексы под горячие запросы
+
+-- Одно решение на пару (команда, задача). Дубликаты могли появиться из-за гонки
+-- SELECT MAX(id)+1; оставляем самое раннее решение.
+DELETE FROM "solution" s
+USING "solution" d
+WHERE s.team_id = d.team_id AND s.task_id = d.task_id AND s.solution_id > d.solution_id;
+
+-- solution WHERE team_id = $1 AND task_id = $2; solution WHERE team_id = $1 ORDER BY task_id
+CREATE UNIQUE INDEX IF NOT EXISTS "solution_team_task_uidx" ON "solution" ("team_id", "task_id");
+
+-- solution WHERE task_id = $1 ORDER BY team_id
+CREATE INDEX IF NOT EXISTS "solution_task_team_idx" ON "solution" ("task_id", "team_id");
+
+-- MAX(sent_at) GROUP BY team_id
+CREATE INDEX IF NOT EXISTS "solution_team_sent_idx" ON "solution" ("team_id", "sent_at");
+
+-- Выборки по статусу (например, все решения на проверке по задаче)
+CREATE INDEX IF NOT EXISTS "solution_condition_idx" ON "solution" ("condition", "task_id");
@@ -0,0 +1,11 @@
+-- Общие для всех воркеров корзины ограничителя частоты запросов (rate_limit.PostgresBackend).
+-- UNLOGGED: после аварийного рестарта счётчики просто обнулятся.
+CREATE UNLOGGED TABLE IF NOT EXISTS "rate_limit_buckets" (
+    "key" varchar(255) NOT NULL,
+    "tokens" double precision NOT NULL,
+    "allowed" boolean NOT NULL,
+    "updated_at" timestamp with time zone NOT NULL,
+    PRIMARY KEY ("key")
+);
+
+CREATE INDEX IF NOT EXISTS "rate_limit_buckets_updated_idx" ON "rate_limit_buckets" ("updated_at");
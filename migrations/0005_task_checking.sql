@@ -0,0 +1,4 @@
+-- Автопроверка ответов (grader.py): способ проверки задаётся на задачу.
+-- manual — как раньше, решение ждёт модератора; остальные режимы см. checkers.py.
+ALTER TABLE "task" ADD COLUMN IF NOT EXISTS "check_mode" varchar(32) NOT NULL DEFAULT 'manual';
+ALTER TABLE "task" ADD COLUMN IF NOT EXISTS "check_options" jsonb NOT NULL DEFAULT '{}'::jsonb;
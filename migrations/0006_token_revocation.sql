@@ -0,0 +1,8 @@
+-- Отозванные токены не удаляются, а помечаются: по этим строкам stateless-режим
+-- (revocation.py) восстанавливает множество отозванных токенов при старте воркера.
+ALTER TABLE "auth_tokens" ADD COLUMN IF NOT EXISTS "revoked_at" timestamp with time zone;
+
+-- С jti и длинным логином команды токен может не уместиться в 255 символов
+ALTER TABLE "auth_tokens" ALTER COLUMN "token" TYPE text;
+
+CREATE INDEX IF NOT EXISTS "auth_tokens_revoked_idx" ON "auth_tokens" ("expires_at") WHERE "revoked_at" IS NOT NULL;
@@ -0,0 +1,3 @@
+-- Фоновая чистка истёкших токенов (token_maintenance.py) и лимит активных токенов на команду
+CREATE INDEX IF NOT EXISTS "auth_tokens_expires_idx" ON "auth_tokens" ("expires_at");
+CREATE INDEX IF NOT EXISTS "auth_tokens_team_idx" ON "auth_tokens" ("team_id", "token_id");
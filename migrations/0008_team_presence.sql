@@ -0,0 +1,3 @@
+-- Последний heartbeat команды по websocket (presence.py сохраняет пачками).
+-- Колонку teams.status, которую писал ws_status, схема никогда не создавала — она и не нужна.
+ALTER TABLE "teams" ADD COLUMN IF NOT EXISTS "last_seen_at" timestamp with time zone;
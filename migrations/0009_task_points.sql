@@ -0,0 +1,2 @@
+-- Вес задачи в лидерборде (leaderboard.py): столько очков даёт зачтённое решение.
+ALTER TABLE "task" ADD COLUMN IF NOT EXISTS "points" integer NOT NULL DEFAULT 1;
@@ -0,0 +1,78 @@
+import base64
+import binascii
+import json
+import os
+from typing import Optional
+from fastapi import HTTPException, Query
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Keyset-пагинация списков админки: страница — это "ключ > последнего выданного"
+# в том же ORDER BY, что и раньше, так что выдача стабильна при вставках и не деградирует
+# с номером страницы, как OFFSET. Строки читаются серверным курсором порциями.
+MAX_PAGE_SIZE = 1000
+CURSOR_PREFETCH = int(os.getenv("DB_CURSOR_PREFETCH", 500))   # строк за один FETCH
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(scope, after_id):
+    raw = json.dumps([scope, after_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(scope, token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_scope, after_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Курсор одного списка не подходит к другому (например, к другой команде)
+    if cursor_scope != scope or not isinstance(after_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after_id
+
+
+class Page:
+    def __init__(self, after_id, limit, cursor):
+        self.after_id = after_id
+        self.limit = limit          # None — весь список, как раньше
+        self.cursor = cursor
+        self.scope = None
+        self.next_cursor = None
+
+    def bind(self, scope):
+        # Курсор привязан к списку (scope), из которого он выдан; вызывать до обращения к БД
+        self.scope = scope
+        if self.cursor is not None:
+            self.after_id = decode_cursor(scope, self.cursor)
+        return self
+
+    async def rows(self, conn, query, *args, key=0):
+        # query заканчивается на "<ключ> > $n ORDER BY <ключ> LIMIT $n+1":
+        # сюда дописываются последний выданный ключ и размер страницы (+1, чтобы узнать, есть ли ещё)
+        fetch_limit = self.limit + 1 if self.limit is not None else None
+        count = 0
+        last_key = None
+        async with conn.transaction(readonly=True):
+            async for row in conn.cursor(query, *args, self.after_id, fetch_limit, prefetch=CURSOR_PREFETCH):
+                if self.limit is not None and count == self.limit:
+                    self.next_cursor = encode_cursor(self.scope, last_key)
+                    break
+                count += 1
+                last_key = row[key]
+                yield row
+
+    def headers(self):
+        return {NEXT_CURSOR_HEADER: self.next_cursor} if self.next_cursor is not None else {}
+
+    def set_headers(self, response):
+        response.headers.update(self.headers())
+
+
+def page_params(
+    after_id: Optional[int] = Query(None, ge=0, description="Вернуть записи с ключом больше этого"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы; без него — весь список"),
+    cursor: Optional[str] = Query(None, description=f"Курсор из заголовка {NEXT_CURSOR_HEADER} предыдущей страницы")
+):
+    return Page(after_id or 0, limit, cursor)
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Хеширование паролей KDF (scrypt или PBKDF2 из hashlib). Оно намеренно дорогое, поэтому
+# выполняется в отдельном пуле процессов, а одновременных вычислений не больше
+# PASSWORD_HASH_CONCURRENCY — волна логинов в начале конкурса не забирает весь сервер.
+# teams.password_hash хранит "scrypt$n$r$p$<hex>" или "pbkdf2_sha256$iterations$<hex>",
+# соль — как и раньше в teams.password_salt. Старые строки (один SHA-256) принимаются
+# и перехешируются при первом успешном входе.
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "scrypt")
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", 8))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", 1))
+PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", 600000))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))             # процессов в пуле
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", 4))     # вычислений одновременно
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))          # сек ожидания очереди
+DKLEN = 32
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def current_params():
+    if PASSWORD_HASH_SCHEME == "pbkdf2":
+        return ("pbkdf2_sha256", PBKDF2_ITERATIONS)
+    return ("scrypt", SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def _derive(password, salt, params):
+    if params[0] == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), params[1], DKLEN)
+    n, r, p = params[1:]
+    return hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                          maxmem=128 * n * r * p + 1024 * 1024, dklen=DKLEN)
+
+
+def _parse(encoded):
+    parts = encoded.split("$")
+    if parts[0] == "scrypt" and len(parts) == 5:
+        return ("scrypt", int(parts[1]), int(parts[2]), int(parts[3])), parts[4]
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 3:
+        return ("pbkdf2_sha256", int(parts[1])), parts[2]
+    return None, encoded   # старый формат: sha256(password + salt)
+
+
+def make_hash(password, salt=None, params=None):
+    salt = salt or os.urandom(16).hex()
+    params = params or current_params()
+    digest = _derive(password, salt, params).hex()
+    return "$".join([*map(str, params), digest]), salt
+
+
+def check_hash(password, encoded, salt):
+    params, digest = _parse(encoded)
+    if params is None:
+        computed = hashlib.sha256((password + salt).encode()).hexdigest()
+    else:
+        computed = _derive(password, salt, params).hex()
+    return hmac.compare_digest(computed, digest)
+
+
+def needs_rehash(encoded):
+    params, _ = _parse(encoded)
+    return params != current_params()
+
+
+def _verify_job(password, encoded, salt):
+    # Выполняется в процессе пула: проверка и, если формат устарел, сразу новый хеш
+    if not check_hash(password, encoded, salt):
+        return False, None
+    if needs_rehash(encoded):
+        return True, make_hash(password)
+    return True, None
+
+
+_executor = None
+_semaphore = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn: не наследуем от воркера uvicorn event loop, соединения и потоки
+        _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+async def _run(func, *args):
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+    try:
+        await asyncio.wait_for(_semaphore.acquire(), PASSWORD_HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PasswordHasherBusy()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+    finally:
+        _semaphore.release()
+
+
+async def hash_password(password):
+    # -> (password_hash, password_salt)
+    return await _run(make_hash, password)
+
+
+async def verify_password(password, encoded, salt):
+    # -> (совпал ли пароль, (новый hash, новая salt) или None)
+    return await _run(_verify_job, password, encoded, salt)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+import events
+from db_connect import connection
+
+load_dotenv()
+
+# Кто из команд сейчас на связи. Источник — heartbeat'ы командного websocket (/ws/team/status);
+# состояние живёт в памяти, раз в PRESENCE_FLUSH_INTERVAL свежие отметки пачкой пишутся
+# в teams.last_seen_at и рассылаются другим воркерам. Дашборд только читает is_online().
+PRESENCE_TIMEOUT = float(os.getenv("PRESENCE_TIMEOUT", 30))                # сек без heartbeat — отключена
+PRESENCE_FLUSH_INTERVAL = float(os.getenv("PRESENCE_FLUSH_INTERVAL", 10))  # сек между записями в БД
+CHANNEL = "presence"
+NOTIFY_PAYLOAD_LIMIT = 7000   # байт отметок в одном уведомлении; предел pg_notify — 8000 вместе с конвертом
+
+
+class Presence:
+    def __init__(self):
+        self._connections = {}     # team_id -> число websocket'ов на этом воркере
+        self._seen = {}            # team_id -> время последнего heartbeat (unix), свои и чужие
+        self._dirty = {}           # team_id -> время, ещё не записанное в БД
+        self._gone = []            # команды, закрывшие последний сокет на этом воркере
+        self._listeners = []       # вызываются, когда команда подключилась или отключилась
+        self._task = None
+        self.flushes = 0
+        self.flushed = 0
+        self.failed_flushes = 0
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
+
+    def is_online(self, team_id, now=None):
+        seen = self._seen.get(team_id)
+        return seen is not None and (now or time.time()) - seen <= PRESENCE_TIMEOUT
+
+    def online_teams(self):
+        now = time.time()
+        return {team_id for team_id in self._seen if self.is_online(team_id, now)}
+
+    def heartbeat(self, team_id):
+        was_online = self.is_online(team_id)
+        now = time.time()
+        self._seen[team_id] = now
+        self._dirty[team_id] = now
+        if not was_online:
+            self._notify()
+
+    def connect(self, team_id):
+        self._connections[team_id] = self._connections.get(team_id, 0) + 1
+        self.heartbeat(team_id)
+
+    def disconnect(self, team_id):
+        count = self._connections.get(team_id, 0) - 1
+        if count > 0:
+            self._connections[team_id] = count
+            return
+        self._connections.pop(team_id, None)
+        # Последний сокет закрыт — не ждём таймаута; если команда подключена к другому
+        # воркеру, тот вернёт её при ближайшей рассылке
+        self._seen.pop(team_id, None)
+        self._gone.append(team_id)
+        self._notify()
+
+    def _apply(self, message):
+        for team_id, seen in message.get("seen", []):
+            if seen > self._seen.get(team_id, 0):
+                was_online = self.is_online(team_id)
+                self._seen[team_id] = seen
+                if not was_online and self.is_online(team_id):
+                    self._notify()
+        for team_id in message.get("gone", []):
+            if team_id not in self._connections and self._seen.pop(team_id, None) is not None:
+                self._notify()
+
+    async def load(self):
+        # Начальное состояние для нового воркера: остальные воркеры пишут last_seen_at
+        async with connection() as conn:
+            rows = await conn.fetch("""
+                SELECT team_id, last_seen_at FROM teams
+                WHERE last_seen_at > NOW() - make_interval(secs => $1)
+            """, PRESENCE_TIMEOUT)
+        for team_id, seen in rows:
+            self._seen[team_id] = max(self._seen.get(team_id, 0), seen.timestamp())
+
+    async def flush(self):
+        dirty, self._dirty = self._dirty, {}
+        gone, self._gone = self._gone, []
+        if not dirty and not gone:
+            return
+        try:
+            async with connection() as conn:
+                if dirty:
+                    await conn.execute("""
+                        UPDATE teams AS t SET last_seen_at = v.seen
+                        FROM unnest($1::bigint[], $2::timestamptz[]) AS v(team_id, seen)
+                        WHERE t.team_id = v.team_id AND (t.last_seen_at IS NULL OR t.last_seen_at < v.seen)
+                    """, list(dirty), [datetime.fromtimestamp(seen, timezone.utc) for seen in dirty.values()])
+                for message in _messages(dirty, gone):
+                    await events.publish(conn, CHANNEL, message)
+        except Exception:
+            # Отметки не потеряются: вернём их к следующей записи, если новых ещё не было
+            for team_id, seen in dirty.items():
+                if seen > self._dirty.get(team_id, 0):
+                    self._dirty[team_id] = seen
+            self._gone.extend(gone)
+            raise
+        self.flushes += 1
+        self.flushed += len(dirty)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(PRESENCE_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed_flushes += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            pass
+
+    def stats(self):
+        return {
+            "connections": sum(self._connections.values()),
+            "local_teams": len(self._connections),
+            "online": len(self.online_teams()),
+            "timeout": PRESENCE_TIMEOUT,
+            "pending": len(self._dirty),
+            "flushes": self.flushes,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+def _messages(dirty, gone):
+    # Делим отметки и отключения на уведомления по размеру в байтах, а не по числу записей:
+    # длина записи зависит от разрядности team_id. Время округляем до сотых секунды
+    message, size = {"seen": [], "gone": []}, 0
+    entries = [("seen", [team_id, round(seen, 2)]) for team_id, seen in dirty.items()]
+    entries += [("gone", team_id) for team_id in gone]
+    for key, entry in entries:
+        entry_size = len(json.dumps(entry)) + 2
+        if size + entry_size > NOTIFY_PAYLOAD_LIMIT and size:
+            yield message
+            message, size = {"seen": [], "gone": []}, 0
+        message[key].append(entry)
+        size += entry_size
+    yield message
+
+
+presence = Presence()
+events.subscribe(CHANNEL, presence._apply)
+
+
+def presence_stats():
+    return presence.stats()
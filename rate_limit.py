@@ -0,0 +1,156 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from fastapi import Depends, HTTPException, Request, Response
+from dotenv import load_dotenv
+from db_connect import connection, DB_UNAVAILABLE_ERRORS
+
+load_dotenv()
+
+# memory — корзины в памяти процесса (один воркер);
+# postgres — общие корзины в таблице rate_limit_buckets (uvicorn --workers N)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+PURGE_INTERVAL = 300    # сек между чистками забытых корзин в БД
+
+
+class MemoryBackend:
+    # Token bucket; ключей не больше max_keys, самые давно не использованные вытесняются
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # key -> (tokens, updated)
+
+    async def take(self, key, capacity, rate):
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    async def refund(self, key, capacity):
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            self._buckets[key] = (min(capacity, bucket[0] + 1), bucket[1])
+
+    def size(self):
+        return len(self._buckets)
+
+
+class PostgresBackend:
+    # Тот же token bucket, но пересчёт и списание — одним атомарным UPSERT
+    def __init__(self):
+        self._last_purge = time.monotonic()
+
+    async def take(self, key, capacity, rate):
+        async with connection() as conn:
+            tokens, allowed = await conn.fetchrow("""
+                INSERT INTO rate_limit_buckets AS b (key, tokens, allowed, updated_at)
+                VALUES ($1, $2 - 1, TRUE, clock_timestamp())
+                ON CONFLICT (key) DO UPDATE SET
+                    allowed = LEAST($2, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * $3) >= 1,
+                    tokens = LEAST($2, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * $3)
+                             - CASE WHEN LEAST($2, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * $3) >= 1
+                                    THEN 1 ELSE 0 END,
+                    updated_at = clock_timestamp()
+                RETURNING tokens, allowed
+            """, key, float(capacity), float(rate))
+            if time.monotonic() - self._last_purge > PURGE_INTERVAL:
+                self._last_purge = time.monotonic()
+                # Корзины, которые давно наполнились, ничем не отличаются от отсутствующих
+                await conn.execute(
+                    "DELETE FROM rate_limit_buckets WHERE updated_at < NOW() - make_interval(secs => $1)",
+                    PURGE_INTERVAL * 4
+                )
+        return allowed, tokens
+
+    async def refund(self, key, capacity):
+        async with connection() as conn:
+            await conn.execute(
+                "UPDATE rate_limit_buckets SET tokens = LEAST($2, tokens + 1) WHERE key = $1",
+                key, float(capacity)
+            )
+
+    def size(self):
+        return None
+
+
+def make_backend(name=RATE_LIMIT_BACKEND):
+    if name == "postgres":
+        return PostgresBackend()
+    return MemoryBackend()
+
+
+_limiters = {}
+
+
+class RateLimiter:
+    def __init__(self, name, requests, per_seconds, backend=None):
+        self.name = name
+        self.capacity = requests
+        self.rate = requests / per_seconds
+        self.per_seconds = per_seconds
+        self.backend = backend or make_backend()
+        self.allowed = 0
+        self.throttled = 0
+        self.refunded = 0
+        _limiters[name] = self
+
+    async def hit(self, key, response=None):
+        try:
+            allowed, tokens = await self.backend.take(f"{self.name}:{key}", self.capacity, self.rate)
+        except DB_UNAVAILABLE_ERRORS:
+            raise HTTPException(status_code=503, detail="Database connection failed")
+        if not allowed:
+            self.throttled += 1
+            retry_after = max(1, math.ceil((1 - tokens) / self.rate))
+            raise HTTPException(
+                status_code=429,
+                detail=f"Request allowed {self.capacity} time(s) every {self.per_seconds:g} seconds. Please wait {retry_after} sec.",
+                headers={"Retry-After": str(retry_after)}
+            )
+        self.allowed += 1
+        if response is not None:
+            response.headers["X-RateLimit-Limit"] = str(self.capacity)
+            response.headers["X-RateLimit-Remaining"] = str(int(tokens))
+
+    async def refund(self, key):
+        # Вернуть списанный запрос, если обработчик ничего не выдал (404, 503 и т.п.)
+        try:
+            await self.backend.refund(f"{self.name}:{key}", self.capacity)
+        except DB_UNAVAILABLE_ERRORS:
+            return
+        self.allowed -= 1
+        self.refunded += 1
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "requests": self.capacity,
+            "per_seconds": self.per_seconds,
+            "allowed": self.allowed,
+            "throttled": self.throttled,
+            "refunded": self.refunded,
+            "keys": self.backend.size(),
+        }
+
+
+def client_ip(request: Request):
+    return request.client.host if request.client else "unknown"
+
+
+def limit(limiter, key=client_ip):
+    # Зависимость FastAPI: dependencies=[Depends(limit(limiter))] или с другим key-зависимостью
+    async def dependency(response: Response, key_value: str = Depends(key)):
+        await limiter.hit(key_value, response)
+    return dependency
+
+
+def limiter_stats():
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,140 @@
+import hashlib
+import os
+from collections import OrderedDict
+from fastapi import Response
+from dotenv import load_dotenv
+import events
+import fast_json
+import scoreboard
+
+load_dotenv()
+
+# Кеш готовых ответов списочных GET (дашборд, списки задач и решений). Ключ — путь и параметры
+# запроса, значение — уже сериализованное тело и его ETag. Любая запись (события scoreboard,
+# свои и других воркеров, и явный invalidate()) увеличивает номер версии данных, и все
+# записи кеша со старой версией становятся недействительными. ETag — хеш тела, поэтому он
+# одинаков на всех воркерах, и повторный запрос с If-None-Match получает 304 без тела.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 256))   # 0 — только ETag, без кеша
+INVALIDATION_CHANNEL = "response_cache_invalidate"
+
+
+def etag_for(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def request_key(request):
+    params = sorted(request.query_params.multi_items())
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in params)
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+class ResponseCache:
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self.enabled = True
+        self.version = 0
+        self._entries = OrderedDict()    # key -> (version, etag, body, headers)
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "evictions": 0,
+            "bumps": 0,
+        }
+
+    def bump(self, *_):
+        # Подходит как обработчик любого события: аргументы не нужны
+        self.version += 1
+        self._stats["bumps"] += 1
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if not self.enabled or entry is None or entry[0] != self.version:
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry
+
+    def put(self, key, version, body, headers):
+        entry = (version, etag_for(body), body, headers)
+        if self.enabled and self.max_size > 0 and version == self.version:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+cache = ResponseCache()
+
+
+async def cached(request, build):
+    # build() -> (данные для JSON, доп. заголовки); вызывается, только если в кеше нет
+    # актуального ответа. Версию запоминаем до построения: если во время запроса к БД
+    # случится запись, результат не попадёт в кеш под новой версией
+    key = request_key(request)
+    entry = cache.get(key)
+    if entry is None:
+        version = cache.version
+        content, headers = await build()
+        entry = cache.put(key, version, fast_json.dumps(content), headers)
+    _, etag, body, headers = entry
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        cache._stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def invalidate(conn):
+    # Для записей, которые не проходят через scoreboard.record (например, смена check_mode)
+    cache.bump()
+    await events.publish(conn, INVALIDATION_CHANNEL, {})
+
+
+def _on_connect():
+    cache.clear()
+    cache.bump()
+    cache.enabled = True
+
+
+def _on_disconnect():
+    # Без шины записи других воркеров до кеша не дойдут
+    cache.enabled = False
+    cache.clear()
+
+
+scoreboard.on_event(cache.bump)
+# Смена статуса подключения команд тоже меняет ответ дашборда
+scoreboard.board.subscribe(cache.bump)
+events.subscribe(INVALIDATION_CHANNEL, cache.bump)
+if events.EVENTS_ENABLED:
+    cache.enabled = False
+    events.on_connect(_on_connect)
+    events.on_disconnect(_on_disconnect)
+
+
+def response_cache_stats():
+    return cache.stats()
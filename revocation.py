@@ -0,0 +1,153 @@
+import os
+import time
+from dotenv import load_dotenv
+import events
+from db_connect import connection
+from token_cache import token_key
+
+load_dotenv()
+
+# Stateless-проверка токенов (AUTH_STATELESS=1): подпись и exp JWT считаются достаточными,
+# а отзыв проверяется по множеству в памяти. Блум-фильтр отсекает почти все токены без
+# обращения к точному множеству; точное множество (token_key -> exp) подтверждает попадания.
+# Множество строится из auth_tokens.revoked_at и синхронизируется между воркерами через events;
+# пока слушатель не подключён, decode_token ходит в БД, как в обычном режиме.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "0") == "1"
+BLOOM_BITS = int(os.getenv("REVOCATION_BLOOM_BITS", 2 ** 20))   # 128 КБ
+BLOOM_HASHES = 7
+PRUNE_INTERVAL = 600    # сек между выбрасыванием истёкших токенов из множества
+CHANNEL = "auth_token_revoked"
+NOTIFY_CHUNK = 80       # записей (64 символа ключа + exp) в одном уведомлении
+
+
+class BloomFilter:
+    def __init__(self, bits=BLOOM_BITS, hashes=BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, key):
+        # key — уже sha256 в hex: берём из него две независимые половины (double hashing)
+        h1 = int(key[:16], 16)
+        h2 = int(key[16:32], 16) | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationSet:
+    def __init__(self):
+        self.ready = False          # множество построено и слушатель событий подключён
+        self._reset()
+        self._stats = {
+            "checks": 0,
+            "bloom_positives": 0,
+            "revoked_hits": 0,
+            "rebuilds": 0,
+        }
+
+    def _reset(self, entries=None):
+        self._entries = entries or {}    # token_key -> exp (unix time)
+        self._bloom = BloomFilter()
+        for key in self._entries:
+            self._bloom.add(key)
+        self._pruned_at = time.time()
+
+    def add(self, key, expires_at):
+        self._entries[key] = expires_at
+        self._bloom.add(key)
+
+    def is_revoked(self, token):
+        self._stats["checks"] += 1
+        if time.time() - self._pruned_at > PRUNE_INTERVAL:
+            self.prune()
+        key = token_key(token)
+        if key not in self._bloom:
+            return False
+        self._stats["bloom_positives"] += 1
+        if key in self._entries:
+            self._stats["revoked_hits"] += 1
+            return True
+        return False
+
+    def prune(self):
+        # Истёкшие токены отклоняет сам JWT (exp); блум-фильтр строится заново, т.к. удалять из него нельзя
+        now = time.time()
+        self._reset({key: exp for key, exp in self._entries.items() if exp > now})
+
+    async def rebuild(self):
+        async with connection() as conn:
+            rows = await conn.fetch(
+                "SELECT token, expires_at FROM auth_tokens WHERE revoked_at IS NOT NULL AND expires_at > NOW()"
+            )
+        # Отзыв необратим, поэтому уже известное (в т.ч. пришедшее, пока шёл запрос) просто объединяем с БД
+        now = time.time()
+        entries = {key: exp for key, exp in self._entries.items() if exp > now}
+        entries.update((token_key(token), expires_at.timestamp()) for token, expires_at in rows)
+        self._reset(entries)
+        self._stats["rebuilds"] += 1
+
+    def stats(self):
+        return {
+            "stateless": AUTH_STATELESS,
+            "ready": self.ready,
+            "revoked": len(self._entries),
+            "bloom_bits": self._bloom.bits,
+            **self._stats,
+        }
+
+
+revoked = RevocationSet()
+
+
+def is_active():
+    return AUTH_STATELESS and revoked.ready
+
+
+async def revoke(conn, tokens):
+    # tokens — [(token, expires_at)] только что помеченных revoked_at строк
+    if not AUTH_STATELESS:
+        return
+    entries = [(token_key(token), expires_at.timestamp()) for token, expires_at in tokens]
+    for key, exp in entries:
+        revoked.add(key, exp)
+    for i in range(0, len(entries), NOTIFY_CHUNK):
+        await events.publish(conn, CHANNEL, {"revoked": entries[i:i + NOTIFY_CHUNK]})
+
+
+def _on_revoked(message):
+    for key, exp in message.get("revoked", []):
+        revoked.add(key, exp)
+
+
+async def _on_connect():
+    # Пока слушателя не было, отзывы с других воркеров могли потеряться — перечитываем из БД
+    revoked.ready = False
+    await revoked.rebuild()
+    revoked.ready = True
+
+
+def _on_disconnect():
+    revoked.ready = False
+
+
+async def start():
+    # Без шины событий (один воркер) множество строится один раз при старте
+    if AUTH_STATELESS and not events.EVENTS_ENABLED:
+        await revoked.rebuild()
+        revoked.ready = True
+
+
+if AUTH_STATELESS:
+    events.subscribe(CHANNEL, _on_revoked)
+    events.on_connect(_on_connect)
+    events.on_disconnect(_on_disconnect)
+
+
+def revocation_stats():
+    return revoked.stats()
@@ -1,84 +1,110 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Body
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
-from db_connect import get_connection
+from pydantic import BaseModel, Field
+from db_connect import connection, DB_UNAVAILABLE_ERRORS
 from routers.auth import decode_token
+import scoreboard
+import checkers
+import response_cache
+import json
+from task_import import detect_format, iter_rows, ImportFormatError
+from pagination import Page, page_params
+from fast_json import rows_content, shape_param
+from task_export import build_query, iter_export, gzip_chunks, MEDIA_TYPES
 from datetime import datetime
-import psycopg2
-from typing import List
+from typing import List, Literal, Optional
 
 router = APIRouter(prefix="/admin/tasks", tags=["admin-tasks"])
 
 security = HTTPBearer()
 
+# Порядок колонок совпадает с SELECT соответствующего списка (condition отдаётся как status)
+TASK_SHORT_COLUMNS = ["task_id", "question", "created_at"]
+TEAM_SOLUTION_COLUMNS = ["solution_id", "task_id", "status", "answer", "sent_at", "approved_at"]
+TEAM_SOLUTION_SHORT_COLUMNS = ["solution_id", "task_id", "status", "sent_at", "approved_at"]
+TASK_SOLUTION_COLUMNS = ["solution_id", "team_id", "status", "answer", "sent_at", "approved_at"]
+TASK_SOLUTION_SHORT_COLUMNS = ["solution_id", "team_id", "status", "sent_at", "approved_at"]
+
 @router.get("/list", responses={
     200: {"description": "List of all tasks"},
+    304: {"description": "Not modified (If-None-Match)"},
     401: {"description": "Unauthorized"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def list_tasks(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def list_tasks(
+    request: Request,
+    page: Page = Depends(page_params),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can view tasks")
+    page.bind("tasks")
+
+    # Пока данные не менялись, отдаётся готовый ответ из кеша (response_cache.py)
+    async def build():
+        async with connection() as conn:
+            result = []
+            async for task in page.rows(conn, """
+                SELECT task_id, qwestion, answer, created_at, check_mode, check_options FROM task
+                WHERE task_id > $1 ORDER BY task_id LIMIT $2
+            """):
+                result.append({
+                    "task_id": task[0],
+                    "question": task[1],
+                    "answer": task[2],
+                    "created_at": task[3],
+                    "check_mode": task[4],
+                    "check_options": json.loads(task[5])
+                })
+        return result, page.headers()
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT task_id, qwestion, answer, created_at FROM task ORDER BY task_id")
-        tasks = cur.fetchall()
-        result = []
-        for task in tasks:
-            result.append({
-                "task_id": task[0],
-                "question": task[1],
-                "answer": task[2],
-                "created_at": task[3].isoformat()
-            })
-        return result
-
-    except psycopg2.OperationalError:
+        return await response_cache.cached(request, build)
+
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.get("/list_short", responses={
     200: {"description": "Short list of all tasks (no answers)"},
+    304: {"description": "Not modified (If-None-Match)"},
     401: {"description": "Unauthorized"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def list_tasks_short(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def list_tasks_short(
+    request: Request,
+    page: Page = Depends(page_params),
+    shape: str = Depends(shape_param),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can view tasks")
+    page.bind("tasks")
+
+    async def build():
+        async with connection() as conn:
+            rows = [row async for row in page.rows(conn, """
+                    SELECT task_id, qwestion, created_at FROM task
+                    WHERE task_id > $1 ORDER BY task_id LIMIT $2
+                """)]
+        return rows_content(TASK_SHORT_COLUMNS, rows, shape), page.headers()
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT task_id, qwestion, created_at FROM task ORDER BY task_id")
-        tasks = cur.fetchall()
-        return [
-            {
-                "task_id": t[0],
-                "question": t[1],
-                "created_at": t[2].isoformat()
-            } for t in tasks
-        ]
-    except psycopg2.OperationalError:
+        return await response_cache.cached(request, build)
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.get("/solution", responses={
     200: {"description": "Single solution by team and task"},
@@ -88,269 +114,428 @@ def list_tasks_short(credentials: HTTPAuthorizationCredentials = Depends(securit
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def get_solution_by_team_and_task(
+async def get_solution_by_team_and_task(
     team_id: int,
     task_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can access solutions")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT solution_id, condition, answer, sent_at, approved_at
-            FROM solution
-            WHERE team_id = %s AND task_id = %s
-        """, (team_id, task_id))
-        row = cur.fetchone()
-
-        if not row:
-            raise HTTPException(status_code=404, detail="Solution not found")
-
-        return {
-            "solution_id": row[0],
-            "status": row[1],
-            "answer": row[2],
-            "sent_at": row[3].isoformat(),
-            "approved_at": row[4].isoformat() if row[4] else None
-        }
-
-    except psycopg2.OperationalError:
+        async with connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT solution_id, condition, answer, sent_at, approved_at
+                FROM solution
+                WHERE team_id = $1 AND task_id = $2
+            """, team_id, task_id)
+
+            if not row:
+                raise HTTPException(status_code=404, detail="Solution not found")
+
+            return {
+                "solution_id": row[0],
+                "status": row[1],
+                "answer": row[2],
+                "sent_at": row[3].isoformat(),
+                "approved_at": row[4].isoformat() if row[4] else None
+            }
+
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 class TaskIdsInput(BaseModel):
     task_ids: List[int]
 
 @router.get("/team_solutions", responses={
     200: {"description": "Solutions by team"},
+    304: {"description": "Not modified (If-None-Match)"},
     401: {"description": "Unauthorized"},
     400: {"description": "Missing team_id"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def get_team_solutions(
+async def get_team_solutions(
     team_id: int,
+    request: Request,
+    page: Page = Depends(page_params),
+    shape: str = Depends(shape_param),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can view solutions")
+    page.bind(f"team:{team_id}")
+
+    async def build():
+        async with connection() as conn:
+            rows = [row async for row in page.rows(conn, """
+                    SELECT solution_id, task_id, condition, answer, sent_at, approved_at
+                    FROM solution
+                    WHERE team_id = $1 AND task_id > $2
+                    ORDER BY task_id
+                    LIMIT $3
+                """, team_id, key=1)]
+        return rows_content(TEAM_SOLUTION_COLUMNS, rows, shape), page.headers()
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT solution_id, task_id, condition, answer, sent_at, approved_at
-            FROM solution
-            WHERE team_id = %s
-            ORDER BY task_id
-        """, (team_id,))
-        rows = cur.fetchall()
-        return [
-            {
-                "solution_id": r[0],
-                "task_id": r[1],
-                "status": r[2],
-                "answer": r[3],
-                "sent_at": r[4].isoformat(),
-                "approved_at": r[5].isoformat() if r[5] else None
-            } for r in rows
-        ]
-    except psycopg2.OperationalError:
+        return await response_cache.cached(request, build)
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.get("/team_solutions_short", responses={
     200: {"description": "Solutions by team (short, no answer)"},
+    304: {"description": "Not modified (If-None-Match)"},
     401: {"description": "Unauthorized"},
     400: {"description": "Missing team_id"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def get_team_solutions_short(
+async def get_team_solutions_short(
     team_id: int,
+    request: Request,
+    page: Page = Depends(page_params),
+    shape: str = Depends(shape_param),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can view solutions")
+    page.bind(f"team:{team_id}")
+
+    async def build():
+        async with connection() as conn:
+            rows = [row async for row in page.rows(conn, """
+                    SELECT solution_id, task_id, condition, sent_at, approved_at
+                    FROM solution
+                    WHERE team_id = $1 AND task_id > $2
+                    ORDER BY task_id
+                    LIMIT $3
+                """, team_id, key=1)]
+        return rows_content(TEAM_SOLUTION_SHORT_COLUMNS, rows, shape), page.headers()
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT solution_id, task_id, condition, sent_at, approved_at
-            FROM solution
-            WHERE team_id = %s
-            ORDER BY task_id
-        """, (team_id,))
-        rows = cur.fetchall()
-        return [
-            {
-                "solution_id": r[0],
-                "task_id": r[1],
-                "status": r[2],
-                "sent_at": r[3].isoformat(),
-                "approved_at": r[4].isoformat() if r[4] else None
-            } for r in rows
-        ]
-    except psycopg2.OperationalError:
+        return await response_cache.cached(request, build)
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.get("/task_solutions", responses={
     200: {"description": "Solutions by task"},
+    304: {"description": "Not modified (If-None-Match)"},
     401: {"description": "Unauthorized"},
     400: {"description": "Missing task_id"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def get_task_solutions(
+async def get_task_solutions(
     task_id: int,
+    request: Request,
+    page: Page = Depends(page_params),
+    shape: str = Depends(shape_param),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can view solutions")
+    page.bind(f"task:{task_id}")
+
+    async def build():
+        async with connection() as conn:
+            rows = [row async for row in page.rows(conn, """
+                    SELECT solution_id, team_id, condition, answer, sent_at, approved_at
+                    FROM solution
+                    WHERE task_id = $1 AND team_id > $2
+                    ORDER BY team_id
+                    LIMIT $3
+                """, task_id, key=1)]
+        return rows_content(TASK_SOLUTION_COLUMNS, rows, shape), page.headers()
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT solution_id, team_id, condition, answer, sent_at, approved_at
-            FROM solution
-            WHERE task_id = %s
-            ORDER BY team_id
-        """, (task_id,))
-        rows = cur.fetchall()
-        return [
-            {
-                "solution_id": r[0],
-                "team_id": r[1],
-                "status": r[2],
-                "answer": r[3],
-                "sent_at": r[4].isoformat(),
-                "approved_at": r[5].isoformat() if r[5] else None
-            } for r in rows
-        ]
-    except psycopg2.OperationalError:
+        return await response_cache.cached(request, build)
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.get("/task_solutions_short", responses={
     200: {"description": "Solutions by task (short, no answer)"},
+    304: {"description": "Not modified (If-None-Match)"},
     401: {"description": "Unauthorized"},
     400: {"description": "Missing task_id"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def get_task_solutions_short(
+async def get_task_solutions_short(
     task_id: int,
+    request: Request,
+    page: Page = Depends(page_params),
+    shape: str = Depends(shape_param),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can view solutions")
+    page.bind(f"task:{task_id}")
+
+    async def build():
+        async with connection() as conn:
+            rows = [row async for row in page.rows(conn, """
+                    SELECT solution_id, team_id, condition, sent_at, approved_at
+                    FROM solution
+                    WHERE task_id = $1 AND team_id > $2
+                    ORDER BY team_id
+                    LIMIT $3
+                """, task_id, key=1)]
+        return rows_content(TASK_SOLUTION_SHORT_COLUMNS, rows, shape), page.headers()
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT solution_id, team_id, condition, sent_at, approved_at
-            FROM solution
-            WHERE task_id = %s
-            ORDER BY team_id
-        """, (task_id,))
-        rows = cur.fetchall()
-        return [
-            {
-                "solution_id": r[0],
-                "team_id": r[1],
-                "status": r[2],
-                "sent_at": r[3].isoformat(),
-                "approved_at": r[4].isoformat() if r[4] else None
-            } for r in rows
-        ]
-    except psycopg2.OperationalError:
+        return await response_cache.cached(request, build)
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+@router.get("/export", responses={
+    200: {"description": "All matching solutions as NDJSON or CSV (optionally gzip), streamed"},
+    401: {"description": "Unauthorized"},
+    500: {"description": "Internal server error"},
+    503: {"description": "Database unavailable"}
+})
+async def export_solutions(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    gzip: bool = Query(False, description="Сжать выгрузку gzip"),
+    task_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    condition: Optional[Literal["verification", "approve", "reject"]] = None,
+    sent_from: Optional[datetime] = Query(None, description="sent_at >= sent_from"),
+    sent_to: Optional[datetime] = Query(None, description="sent_at < sent_to"),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = await decode_token(token)
+
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=401, detail="Only admin can export solutions")
+
+    query, args = build_query(task_id, team_id, condition, sent_from, sent_to)
+    chunks = iter_export(format, query, args)
+    try:
+        # Первый кусок читаем здесь, чтобы недоступность БД вернулась как 503, а не оборванный поток
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except DB_UNAVAILABLE_ERRORS:
+        raise HTTPException(status_code=503, detail="Database connection failed")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    filename = f"solutions.{format}"
+    media_type = MEDIA_TYPES[format]
+    stream = body()
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+        stream = gzip_chunks(stream)
+    return StreamingResponse(stream, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
 
 class TaskInput(BaseModel):
     question: str
     answer: str
+    check_mode: str = checkers.MANUAL   # см. checkers.MODES
+    check_options: dict = {}
+    points: int = Field(1, ge=0)        # вес задачи в лидерборде
 
 @router.post("/load", responses={
     201: {"description": "Task successfully created"},
+    400: {"description": "Invalid check mode or options"},
     401: {"description": "Unauthorized"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def load_task(
+async def load_task(
     data: TaskInput,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can load tasks")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT MAX(task_id) FROM task")
-        max_id = cur.fetchone()[0] or 0
-        new_id = max_id + 1
+        checkers.validate_spec(data.check_mode, data.check_options, data.answer)
+    except checkers.CheckSpecError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        async with connection() as conn:
+            new_id = await conn.fetchval("""
+                INSERT INTO task (answer, qwestion, created_at, check_mode, check_options, points)
+                VALUES ($1, $2, NOW(), $3, $4, $5)
+                RETURNING task_id
+            """, data.answer, data.question, data.check_mode, json.dumps(data.check_options), data.points)
+
+            await scoreboard.record(conn, {"type": "task", "task_id": new_id})
+            return {"message": "Task successfully created", "task_id": new_id}
+
+    except DB_UNAVAILABLE_ERRORS:
+        raise HTTPException(status_code=503, detail="Database connection failed")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+class CheckModeInput(BaseModel):
+    task_id: int
+    check_mode: str
+    check_options: dict = {}
+
+@router.post("/check_mode", responses={
+    200: {"description": "Check mode updated"},
+    400: {"description": "Invalid check mode or options"},
+    401: {"description": "Unauthorized"},
+    404: {"description": "Task not found"},
+    500: {"description": "Internal server error"},
+    503: {"description": "Database unavailable"}
+})
+async def set_check_mode(
+    data: CheckModeInput,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = await decode_token(token)
+
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=401, detail="Only admin can change check mode")
+
+    try:
+        async with connection() as conn:
+            async with conn.transaction():
+                # В режиме regex без pattern шаблоном служит сам task.answer — проверяем и его
+                expected = await conn.fetchval("SELECT answer FROM task WHERE task_id = $1 FOR UPDATE", data.task_id)
+                error = None
+                if expected is not None:
+                    try:
+                        checkers.validate_spec(data.check_mode, data.check_options, expected)
+                    except checkers.CheckSpecError as e:
+                        error = str(e)
+                    else:
+                        await conn.execute("""
+                            UPDATE task SET check_mode = $2, check_options = $3 WHERE task_id = $1
+                        """, data.task_id, data.check_mode, json.dumps(data.check_options))
+            if expected is not None and error is None:
+                # После COMMIT, иначе проверку могут успеть перечитать по старым данным
+                await checkers.invalidate_task(conn, data.task_id)
+                await response_cache.invalidate(conn)
+    except DB_UNAVAILABLE_ERRORS:
+        raise HTTPException(status_code=503, detail="Database connection failed")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+    if expected is None:
+        raise HTTPException(status_code=404, detail=f"Task with ID {data.task_id} not found")
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    # Решения, ждущие модератора, автопроверка подберёт при ближайшем обходе
+    return {"message": "Check mode updated", "task_id": data.task_id, "check_mode": data.check_mode}
 
-        cur.execute("""
-            INSERT INTO task (task_id, answer, qwestion, created_at)
-            VALUES (%s, %s, %s, NOW())
-        """, (new_id, data.answer, data.question))
+BULK_LOAD_MAX_ROWS = 10000
+NOTIFY_CHUNK = 500   # столько task_id помещается в одно уведомление pg_notify (лимит 8000 байт)
 
-        conn.commit()
-        return {"message": "Task successfully created", "task_id": new_id}
+@router.post("/bulk_load", responses={
+    200: {"description": "Tasks imported; invalid rows are reported in 'errors'"},
+    400: {"description": "Malformed JSON array or CSV header"},
+    401: {"description": "Unauthorized"},
+    413: {"description": "Too many rows"},
+    415: {"description": "Unsupported content type"},
+    500: {"description": "Internal server error"},
+    503: {"description": "Database unavailable"}
+})
+async def bulk_load_tasks(
+    request: Request,
+    all_or_nothing: bool = Query(False, description="Ничего не загружать, если есть хотя бы одна ошибка"),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = await decode_token(token)
 
-    except psycopg2.OperationalError:
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=401, detail="Only admin can load tasks")
+
+    # Тело: JSON-массив, NDJSON или CSV с заголовком question,answer — разбирается потоково
+    try:
+        fmt = detect_format(request.headers.get("content-type"))
+    except ImportFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    rows = []
+    errors = []
+    try:
+        async for row_no, row, error in iter_rows(request.stream(), fmt):
+            if row_no > BULK_LOAD_MAX_ROWS:
+                raise HTTPException(status_code=413, detail=f"No more than {BULK_LOAD_MAX_ROWS} rows per request")
+            if error:
+                errors.append({"row": row_no, "error": error})
+            else:
+                rows.append(row)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not rows or (all_or_nothing and errors):
+        return {"message": "No tasks imported", "inserted": 0, "errors": errors}
+
+    try:
+        async with connection() as conn:
+            async with conn.transaction():
+                # Идентификаторы берём из identity заранее, чтобы вернуть их и загрузить строки одним COPY
+                task_ids = [r[0] for r in await conn.fetch(
+                    "SELECT nextval(pg_get_serial_sequence('task', 'task_id')) FROM generate_series(1, $1)",
+                    len(rows)
+                )]
+                created_at = await conn.fetchval("SELECT NOW()")
+                await conn.copy_records_to_table(
+                    "task",
+                    records=[(task_id, answer, question, created_at) for task_id, (question, answer) in zip(task_ids, rows)],
+                    columns=["task_id", "answer", "qwestion", "created_at"]
+                )
+
+            for i in range(0, len(task_ids), NOTIFY_CHUNK):
+                await scoreboard.record(conn, {"type": "tasks", "task_ids": task_ids[i:i + NOTIFY_CHUNK]})
+            return {
+                "message": "Tasks successfully imported",
+                "inserted": len(task_ids),
+                "first_task_id": task_ids[0],
+                "last_task_id": task_ids[-1],
+                "task_ids": task_ids,
+                "errors": errors
+            }
+
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 class AnswerUpdateRequest(BaseModel):
     team_id: int
@@ -363,40 +548,35 @@ class AnswerUpdateRequest(BaseModel):
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def approve_solution(
+async def approve_solution(
     data: AnswerUpdateRequest,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can approve solutions")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 1 FROM solution WHERE team_id = %s AND task_id = %s
-        """, (data.team_id, data.task_id))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Solution not found")
-
-        cur.execute("""
-            UPDATE solution
-            SET condition = 'approve', approved_at = NOW()
-            WHERE team_id = %s AND task_id = %s
-        """, (data.team_id, data.task_id))
-
-        conn.commit()
-        return {"message": "Solution approved"}
-    except psycopg2.OperationalError:
+        async with connection() as conn:
+            if not await conn.fetchrow("""
+                SELECT 1 FROM solution WHERE team_id = $1 AND task_id = $2
+            """, data.team_id, data.task_id):
+                raise HTTPException(status_code=404, detail="Solution not found")
+
+            await conn.execute("""
+                UPDATE solution
+                SET condition = 'approve', approved_at = NOW()
+                WHERE team_id = $1 AND task_id = $2
+            """, data.team_id, data.task_id)
+
+            await scoreboard.record(conn, {"type": "condition", "team_id": data.team_id, "task_id": data.task_id, "condition": "approve"})
+            return {"message": "Solution approved"}
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 @router.post("/answers/reject", responses={
@@ -406,40 +586,119 @@ def approve_solution(
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def reject_solution(
+async def reject_solution(
     data: AnswerUpdateRequest,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can reject solutions")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 1 FROM solution WHERE team_id = %s AND task_id = %s
-        """, (data.team_id, data.task_id))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Solution not found")
-
-        cur.execute("""
-            UPDATE solution
-            SET condition = 'reject', approved_at = NULL
-            WHERE team_id = %s AND task_id = %s
-        """, (data.team_id, data.task_id))
-
-        conn.commit()
-        return {"message": "Solution rejected"}
-    except psycopg2.OperationalError:
+        async with connection() as conn:
+            if not await conn.fetchrow("""
+                SELECT 1 FROM solution WHERE team_id = $1 AND task_id = $2
+            """, data.team_id, data.task_id):
+                raise HTTPException(status_code=404, detail="Solution not found")
+
+            await conn.execute("""
+                UPDATE solution
+                SET condition = 'reject', approved_at = NULL
+                WHERE team_id = $1 AND task_id = $2
+            """, data.team_id, data.task_id)
+
+            await scoreboard.record(conn, {"type": "condition", "team_id": data.team_id, "task_id": data.task_id, "condition": "reject"})
+            return {"message": "Solution rejected"}
+    except DB_UNAVAILABLE_ERRORS:
+        raise HTTPException(status_code=503, detail="Database connection failed")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+class SolutionPair(BaseModel):
+    team_id: int
+    task_id: int
+
+class BatchModerationRequest(BaseModel):
+    action: Literal["approve", "reject"]
+    pairs: Optional[List[SolutionPair]] = None
+    task_id: Optional[int] = None   # вместо pairs: все решения задачи
+    only_pending: bool = True       # для task_id — только решения на проверке
+
+MODERATION_MAX_PAIRS = 10000
+
+@router.post("/answers/moderate", responses={
+    200: {"description": "Solutions updated; pairs without a solution are listed in 'missing'"},
+    400: {"description": "Neither pairs nor task_id given"},
+    401: {"description": "Unauthorized"},
+    413: {"description": "Too many pairs"},
+    500: {"description": "Internal server error"},
+    503: {"description": "Database unavailable"}
+})
+async def moderate_solutions(
+    data: BatchModerationRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = await decode_token(token)
+
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=401, detail="Only admin can moderate solutions")
+
+    if (data.pairs is None) == (data.task_id is None):
+        raise HTTPException(status_code=400, detail="Specify either 'pairs' or 'task_id'")
+    if data.pairs is not None and len(data.pairs) > MODERATION_MAX_PAIRS:
+        raise HTTPException(status_code=413, detail=f"No more than {MODERATION_MAX_PAIRS} pairs per request")
+
+    try:
+        async with connection() as conn:
+            # Один UPDATE на всю пачку вместо SELECT + UPDATE на каждую пару
+            if data.pairs is not None:
+                requested = list(dict.fromkeys((p.team_id, p.task_id) for p in data.pairs))
+                rows = await conn.fetch("""
+                    UPDATE solution AS s
+                    SET condition = $1::varchar,
+                        approved_at = CASE WHEN $1::varchar = 'approve' THEN NOW() END
+                    FROM unnest($2::bigint[], $3::bigint[]) AS v(team_id, task_id)
+                    WHERE s.team_id = v.team_id AND s.task_id = v.task_id
+                    RETURNING s.team_id, s.task_id
+                """, data.action, [p[0] for p in requested], [p[1] for p in requested])
+            else:
+                requested = None
+                rows = await conn.fetch("""
+                    UPDATE solution
+                    SET condition = $1::varchar,
+                        approved_at = CASE WHEN $1::varchar = 'approve' THEN NOW() END
+                    WHERE task_id = $2 AND (NOT $3 OR condition = 'verification')
+                    RETURNING team_id, task_id
+                """, data.action, data.task_id, data.only_pending)
+
+            updated = [(r[0], r[1]) for r in rows]
+            if requested is not None:
+                found = set(updated)
+                missing = [{"team_id": t, "task_id": k} for t, k in requested if (t, k) not in found]
+            else:
+                missing = []
+
+            # Одно событие на пачку (пара — два числа, поэтому пар в уведомлении вдвое меньше)
+            chunk = NOTIFY_CHUNK // 2
+            for i in range(0, len(updated), chunk):
+                await scoreboard.record(conn, {
+                    "type": "conditions",
+                    "condition": data.action,
+                    "pairs": updated[i:i + chunk]
+                })
+            return {
+                "message": f"{len(updated)} solution(s) updated",
+                "updated": len(updated),
+                "solutions": [{"team_id": t, "task_id": k} for t, k in updated],
+                "missing": missing
+            }
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.delete("/remove", responses={
     200: {"description": "Task successfully deleted"},
@@ -448,39 +707,35 @@ def reject_solution(
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def remove_task(
+async def remove_task(
     task_id: int = Query(..., description="ID задачи для удаления"),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can delete tasks")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Проверим, существует ли задача
-        cur.execute("SELECT COUNT(*) FROM task WHERE task_id = %s", (task_id,))
-        if cur.fetchone()[0] == 0:
-            raise HTTPException(status_code=404, detail=f"Task with ID {task_id} not found")
+        async with connection() as conn:
+            # Проверим, существует ли задача
+            if await conn.fetchval("SELECT COUNT(*) FROM task WHERE task_id = $1", task_id) == 0:
+                raise HTTPException(status_code=404, detail=f"Task with ID {task_id} not found")
 
-        # Удалим решение, если оно есть (внешний ключ от solution к task)
-        cur.execute("DELETE FROM solution WHERE task_id = %s", (task_id,))
-        cur.execute("DELETE FROM task WHERE task_id = %s", (task_id,))
-        conn.commit()
+            # Удалим решение, если оно есть (внешний ключ от solution к task)
+            async with conn.transaction():
+                await conn.execute("DELETE FROM solution WHERE task_id = $1", task_id)
+                await conn.execute("DELETE FROM task WHERE task_id = $1", task_id)
+            await scoreboard.record(conn, {"type": "task_removed", "task_id": task_id})
+            await checkers.invalidate_task(conn, task_id)
 
-        return {"message": f"Task with ID {task_id} successfully deleted"}
+            return {"message": f"Task with ID {task_id} successfully deleted"}
 
-    except psycopg2.OperationalError:
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.delete("/answers/remove", responses={
     200: {"description": "Solution successfully deleted"},
@@ -489,43 +744,37 @@ def remove_task(
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def remove_solution(
+async def remove_solution(
     team_id: int,
     task_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can remove solutions")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Проверяем наличие решения
-        cur.execute("""
-            SELECT 1 FROM solution WHERE team_id = %s AND task_id = %s
-        """, (team_id, task_id))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Solution not found")
-
-        # Удаляем решение
-        cur.execute("""
-            DELETE FROM solution WHERE team_id = %s AND task_id = %s
-        """, (team_id, task_id))
-        conn.commit()
-
-        return {"message": f"Solution for team {team_id} and task {task_id} deleted"}
-
-    except psycopg2.OperationalError:
+        async with connection() as conn:
+            # Проверяем наличие решения
+            if not await conn.fetchrow("""
+                SELECT 1 FROM solution WHERE team_id = $1 AND task_id = $2
+            """, team_id, task_id):
+                raise HTTPException(status_code=404, detail="Solution not found")
+
+            # Удаляем решение
+            await conn.execute("""
+                DELETE FROM solution WHERE team_id = $1 AND task_id = $2
+            """, team_id, task_id)
+            await scoreboard.record(conn, {"type": "solution_removed", "team_id": team_id, "task_id": task_id})
+
+            return {"message": f"Solution for team {team_id} and task {task_id} deleted"}
+
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.delete("/clear", responses={
     200: {"description": "All tasks and solutions successfully deleted"},
@@ -533,31 +782,28 @@ def remove_solution(
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def clear_tasks(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def clear_tasks(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can clear tasks")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
+        async with connection() as conn:
+            # Удаляем сначала все решения, затем все задачи
+            async with conn.transaction():
+                await conn.execute("DELETE FROM solution")
+                await conn.execute("DELETE FROM task")
+            await scoreboard.record(conn, {"type": "tasks_cleared"})
+            await checkers.invalidate_all(conn)
 
-        # Удаляем сначала все решения, затем все задачи
-        cur.execute("DELETE FROM solution")
-        cur.execute("DELETE FROM task")
-        conn.commit()
+            return {"message": "All tasks and solutions successfully deleted"}
 
-        return {"message": "All tasks and solutions successfully deleted"}
-
-    except psycopg2.OperationalError:
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.delete("/answers/clear", responses={
     200: {"description": "All solutions successfully deleted"},
@@ -565,26 +811,21 @@ def clear_tasks(credentials: HTTPAuthorizationCredentials = Depends(security)):
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def clear_all_solutions(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def clear_all_solutions(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can clear solutions")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("DELETE FROM solution")
-        conn.commit()
+        async with connection() as conn:
+            await conn.execute("DELETE FROM solution")
+            await scoreboard.record(conn, {"type": "solutions_cleared"})
 
-        return {"message": "All solutions successfully deleted"}
+            return {"message": "All solutions successfully deleted"}
 
-    except psycopg2.OperationalError as e:
+    except DB_UNAVAILABLE_ERRORS as e:
         raise HTTPException(status_code=503, detail=f"Database unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
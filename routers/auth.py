@@ -1,12 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-import psycopg2
-import hashlib
 import jwt
 import os
+import uuid
 from datetime import datetime, timedelta, timezone
-from db_connect import get_connection
+from db_connect import connection, DB_UNAVAILABLE_ERRORS
+import token_cache
+import revocation
+import token_maintenance
+import passwords
+import scoreboard
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,48 +29,84 @@ class RegisterRequest(BaseModel):
     login: str
     password: str
 
-def verify_password(password, hash_, salt):
-    return hashlib.sha256((password + salt).encode()).hexdigest() == hash_
+async def authenticate(login, password):
+    # Соединение не держим, пока считается хеш: при волне логинов оно нужнее другим запросам
+    async with connection() as conn:
+        row = await conn.fetchrow("SELECT team_id, login, password_hash, password_salt FROM teams WHERE login = $1", login)
+    if not row:
+        return None
+    team_id, login, hash_, salt = row
+    ok, rehashed = await passwords.verify_password(password, hash_, salt)
+    if not ok:
+        return None
+    return team_id, login, hash_, rehashed
+
+async def issue_token(team, role):
+    team_id, login, old_hash, rehashed = team
+    async with connection() as conn:
+        if rehashed:
+            # Старый формат или устаревшая стоимость — сохраняем новый хеш, если пароль не меняли параллельно
+            await conn.execute("""
+                UPDATE teams SET password_hash = $1, password_salt = $2, updated_at = NOW()
+                WHERE team_id = $3 AND password_hash = $4
+            """, rehashed[0], rehashed[1], team_id, old_hash)
+        token, expires = generate_token(team_id, login, role)
+        await store_token(conn, token, team_id, expires)
+        await token_maintenance.enforce_team_limit(conn, team_id)
+    return {"token": token, "team_id": team_id, "team_name": login}
 
 TOKEN_EXP_HOURS = int(os.getenv("JWT_EXP_HOURS", 2))
 
 def generate_token(team_id, team_name, role):
-    expires = datetime.utcnow() + timedelta(hours=TOKEN_EXP_HOURS)
+    expires = datetime.now(timezone.utc) + timedelta(hours=TOKEN_EXP_HOURS)
     payload = {
         "team_id": team_id,
         "team_name": team_name,
         "role": role,
-        "exp": expires
+        "exp": expires,
+        # Без случайного jti два входа одной команды в одну секунду дают одинаковый токен
+        "jti": uuid.uuid4().hex
     }
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token, expires
 
-def decode_token(token: str):
-    try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT expires_at FROM auth_tokens WHERE token = %s", (token,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=401, detail="Token not found")
-        expires_at = row[0]
-        if datetime.now(timezone.utc) > expires_at:
+async def decode_token(token: str):
+    if revocation.is_active():
+        # Stateless: подпись и exp решают всё, отзыв — по множеству в памяти, без обращения к БД
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token expired")
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if revocation.revoked.is_revoked(token):
+            raise HTTPException(status_code=401, detail="Token revoked")
+        return payload
+    payload = token_cache.cache.get(token)
+    if payload is not None:
+        return payload
+    try:
+        async with connection() as conn:
+            row = await conn.fetchrow("SELECT expires_at FROM auth_tokens WHERE token = $1 AND revoked_at IS NULL", token)
+            if not row:
+                raise HTTPException(status_code=401, detail="Token not found")
+            expires_at = row[0]
+            if datetime.now(timezone.utc) > expires_at:
+                raise HTTPException(status_code=401, detail="Token expired")
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            token_cache.cache.put(token, payload, expires_at)
+            return payload
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.post("/login", responses={
     200: {"description": "Successful login"},
     401: {"description": "Invalid credentials"},
     403: {"description": "Admin must use admin login endpoint"},
     500: {"description": "Internal server error"},
-    503: {"description": "Database unavailable"}
+    503: {"description": "Database unavailable or too many concurrent logins"}
 })
-def team_login(data: LoginRequest):
+async def team_login(data: LoginRequest):
     if data.login.lower() == "admin":
         raise HTTPException(
             status_code=403,
@@ -74,65 +114,42 @@ def team_login(data: LoginRequest):
         )
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT team_id, login, password_hash, password_salt FROM teams WHERE login = %s", (data.login,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=401, detail={"error": "invalid_credentials", "message": "Invalid login or password"})
-        team_id, login, hash_, salt = row
-        if not verify_password(data.password, hash_, salt):
+        team = await authenticate(data.login, data.password)
+        if team is None:
             raise HTTPException(status_code=401, detail={"error": "invalid_credentials", "message": "Invalid login or password"})
-        token, expires = generate_token(team_id, login, "team")
-        store_token(conn, token, team_id, expires)
-        return {"token": token, "team_id": team_id, "team_name": login}
-    except psycopg2.OperationalError:
+        return await issue_token(team, "team")
+    except passwords.PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many logins at once, retry later", headers={"Retry-After": "1"})
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @router.post("/login/admin", responses={
     200: {"description": "Successful admin login"},
     401: {"description": "Invalid admin credentials"},
     500: {"description": "Internal server error"},
-    503: {"description": "Database unavailable"}
+    503: {"description": "Database unavailable or too many concurrent logins"}
 })
-def admin_login(data: LoginRequest):
+async def admin_login(data: LoginRequest):
     try:
         if data.login != "admin":
             raise HTTPException(status_code=401, detail={"error": "invalid_credentials", "message": "Invalid login or password"})
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT team_id, login, password_hash, password_salt FROM teams WHERE login = %s", ("admin",))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=401, detail={"error": "invalid_credentials", "message": "Invalid login or password"})
-        team_id, login, hash_, salt = row
-        if not verify_password(data.password, hash_, salt):
+        team = await authenticate("admin", data.password)
+        if team is None:
             raise HTTPException(status_code=401, detail={"error": "invalid_credentials", "message": "Invalid login or password"})
-        token, expires = generate_token(team_id, login, "admin")
-        store_token(conn, token, team_id, expires)
-        return {"token": token, "team_id": team_id, "team_name": login}
-    except psycopg2.OperationalError:
+        return await issue_token(team, "admin")
+    except passwords.PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many logins at once, retry later", headers={"Retry-After": "1"})
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
-def store_token(conn, token, team_id, expires_at):
-    cur = conn.cursor()
-    cur.execute("SELECT MAX(token_id) FROM auth_tokens")
-    max_id = cur.fetchone()[0] or 0
-    new_id = max_id + 1
-    cur.execute(
-        "INSERT INTO auth_tokens (token_id, token, expires_at, team_id) VALUES (%s, %s, %s, %s)",
-        (new_id, token, expires_at, team_id)
+async def store_token(conn, token, team_id, expires_at):
+    await conn.execute(
+        "INSERT INTO auth_tokens (token, expires_at, team_id) VALUES ($1, $2, $3)",
+        token, expires_at, team_id
     )
-    conn.commit()
 
 @router.post("/register", responses={
     201: {"description": "Team successfully registered"},
@@ -142,12 +159,12 @@ def store_token(conn, token, team_id, expires_at):
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def register_team(
+async def register_team(
     data: RegisterRequest,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "admin":
         raise HTTPException(status_code=401, detail="Only admin can register teams")
@@ -156,33 +173,84 @@ def register_team(
         raise HTTPException(status_code=400, detail="Login 'admin' is reserved and cannot be used")
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Check for duplicate login
-        cur.execute("SELECT COUNT(*) FROM teams WHERE login = %s", (data.login,))
-        if cur.fetchone()[0] > 0:
-            raise HTTPException(status_code=409, detail="Login already exists")
-
-        # Create team
-        salt = os.urandom(16).hex()
-        hash_ = hashlib.sha256((data.password + salt).encode()).hexdigest()
-        cur.execute("SELECT MAX(team_id) FROM teams")
-        max_id = cur.fetchone()[0] or 0
-        new_id = max_id + 1
-
-        cur.execute("""
-            INSERT INTO teams (team_id, updated_at, login, password_hash, password_salt, created_at)
-            VALUES (%s, NOW(), %s, %s, %s, NOW())
-        """, (new_id, data.login, hash_, salt))
-
-        conn.commit()
-        return {"message": "Team registered successfully", "team_id": new_id, "team_name": data.login}
-
-    except psycopg2.OperationalError:
+        hash_, salt = await passwords.hash_password(data.password)
+        async with connection() as conn:
+            # Create team; duplicate login is detected by the UNIQUE constraint
+            new_id = await conn.fetchval("""
+                INSERT INTO teams (updated_at, login, password_hash, password_salt, created_at)
+                VALUES (NOW(), $1, $2, $3, NOW())
+                ON CONFLICT (login) DO NOTHING
+                RETURNING team_id
+            """, data.login, hash_, salt)
+            if new_id is None:
+                raise HTTPException(status_code=409, detail="Login already exists")
+
+            await scoreboard.record(conn, {"type": "team", "team_id": new_id, "login": data.login})
+            return {"message": "Team registered successfully", "team_id": new_id, "team_name": data.login}
+
+    except passwords.PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Password hashing is busy, retry later", headers={"Retry-After": "1"})
+    except DB_UNAVAILABLE_ERRORS:
+        raise HTTPException(status_code=503, detail="Database connection failed")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.post("/logout", responses={
+    200: {"description": "Token revoked"},
+    401: {"description": "Unauthorized"},
+    500: {"description": "Internal server error"},
+    503: {"description": "Database unavailable"}
+})
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    await decode_token(token)
+
+    try:
+        async with connection() as conn:
+            # Строка остаётся с revoked_at: по ней stateless-режим восстанавливает отзывы
+            rows = await conn.fetch("""
+                UPDATE auth_tokens SET revoked_at = NOW()
+                WHERE token = $1 AND revoked_at IS NULL
+                RETURNING token, expires_at
+            """, token)
+            await token_cache.revoke_token(conn, token)
+            await revocation.revoke(conn, rows)
+            return {"message": "Logged out"}
+    except DB_UNAVAILABLE_ERRORS:
+        raise HTTPException(status_code=503, detail="Database connection failed")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+class RevokeRequest(BaseModel):
+    team_id: int
+
+@router.post("/revoke", responses={
+    200: {"description": "All tokens of the team revoked"},
+    401: {"description": "Unauthorized - admin token required"},
+    500: {"description": "Internal server error"},
+    503: {"description": "Database unavailable"}
+})
+async def revoke_team_tokens(
+    data: RevokeRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = await decode_token(token)
+
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=401, detail="Only admin can revoke tokens")
+
+    try:
+        async with connection() as conn:
+            rows = await conn.fetch("""
+                UPDATE auth_tokens SET revoked_at = NOW()
+                WHERE team_id = $1 AND revoked_at IS NULL AND expires_at > NOW()
+                RETURNING token, expires_at
+            """, data.team_id)
+            await token_cache.revoke_team(conn, data.team_id)
+            await revocation.revoke(conn, rows)
+            return {"message": "Tokens revoked", "revoked": len(rows)}
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
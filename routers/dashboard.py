@@ -1,72 +1,76 @@
-from fastapi import APIRouter, HTTPException
-from db_connect import get_connection
-import psycopg2
-from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from db_connect import DB_UNAVAILABLE_ERRORS
+from scoreboard import board
+from leaderboard import leaderboard
+import response_cache
+from fast_json import FastJSONResponse
+from routers.auth import decode_token
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+optional_security = HTTPBearer(auto_error=False)
 
 @router.get("/", responses={
     200: {"description": "Dashboard with team statuses and task results"},
+    304: {"description": "Not modified (If-None-Match)"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def get_dashboard():
-    try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Получаем команды
-        cur.execute("SELECT team_id, login FROM teams ORDER BY team_id")
-        teams = cur.fetchall()
-
-        # Получаем все задания
-        cur.execute("SELECT task_id FROM task ORDER BY task_id")
-        task_ids = [row[0] for row in cur.fetchall()]
-
-        # Все решения
-        cur.execute("SELECT team_id, task_id, condition, sent_at, approved_at FROM solution")
-        solutions_raw = cur.fetchall()
+async def get_dashboard(request: Request):
+    async def build():
+        return board.snapshot(), {}
 
-        # Последняя активность для определения подключения
-        cur.execute("SELECT team_id, MAX(sent_at) FROM solution GROUP BY team_id")
-        now = datetime.now(timezone.utc)
-        activity = {
-            row[0]: "подключена" if now - row[1] <= timedelta(minutes=2) else "отключена"
-            for row in cur.fetchall()
-        }
-
-        # Решения по командам и задачам
-        solutions = {}
-        for team_id, task_id, condition, _, _ in solutions_raw:
-            if team_id not in solutions:
-                solutions[team_id] = {}
-            if condition == "approve":
-                status = "зачет"
-            elif condition == "verification":
-                status = "отправлен"
-            else:
-                status = "отклонено"
-            solutions[team_id][task_id] = status
+    try:
+        # Состояние строится из БД один раз, дальше обновляется событиями записи.
+        # Статусы подключения сверяем заранее: их смена тоже сбрасывает кешированный ответ
+        await board.ensure_loaded()
+        board.refresh_online()
+        return await response_cache.cached(request, build)
 
-        # Формируем итог
-        result = []
-        for team_id, login in teams:
-            row = {
-                "team_name": login,
-                "status": activity.get(team_id, "отключена"),
-                "files": {
-                    str(task_id): solutions.get(team_id, {}).get(task_id, "")
-                    for task_id in task_ids
-                }
-            }
-            result.append(row)
+    except DB_UNAVAILABLE_ERRORS as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
-        return result
+@router.get("/leaderboard", responses={
+    200: {"description": "Team ranking (frozen near the end of the contest)"},
+    401: {"description": "Live ranking during freeze is for admin only"},
+    404: {"description": "Team not found"},
+    500: {"description": "Internal server error"},
+    503: {"description": "Database unavailable"}
+})
+async def get_leaderboard(
+    limit: Optional[int] = Query(None, ge=1, description="Только первые N команд"),
+    team: Optional[str] = Query(None, description="Логин команды: её место отдельно в поле team"),
+    live: bool = Query(False, description="Без заморозки (только администратор)"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    if live:
+        payload = await decode_token(credentials.credentials) if credentials else {}
+        if payload.get("role") != "admin":
+            raise HTTPException(status_code=401, detail="Only admin can see the live leaderboard")
 
-    except psycopg2.OperationalError as e:
+    try:
+        await leaderboard.ensure_ready()
+        standings = leaderboard.standings(live)
+        teams = standings.top(limit)
+        team_row = None
+        if team is not None:
+            team_id = board.team_by_login.get(team)
+            if team_id in standings.entries:
+                team_row = standings.row(team_id)
+    except DB_UNAVAILABLE_ERRORS as e:
         raise HTTPException(status_code=503, detail=f"Database unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+    if team is not None and team_row is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    # Готовые dict'ы сериализуются напрямую, без jsonable_encoder
+    return FastJSONResponse({
+        "frozen": standings is leaderboard.frozen,
+        "freeze_at": leaderboard.freeze_at,
+        "teams": teams,
+        "team": team_row
+    })
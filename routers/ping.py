@@ -1,8 +1,17 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.openapi.models import APIKey
-import psycopg2
-from db_connect import get_connection
+from db_connect import connection, pool_stats, DB_UNAVAILABLE_ERRORS
+from token_cache import cache_stats
+from rate_limit import limiter_stats
+from grader import grader
+from revocation import revocation_stats
+from token_maintenance import sweeper_stats
+from presence import presence_stats
+from sequencing import sequencer_stats
+from leaderboard import leaderboard
+from response_cache import response_cache_stats
+from routers.team.ws_status import hub as team_ws_hub
 
 router = APIRouter(prefix="/ping", tags=["ping"])
 
@@ -21,12 +30,122 @@ def ping():
     503: {"description": "Database unavailable"},
     500: {"description": "Unexpected server error"}
 })
-def ping_db():
+async def ping_db():
     try:
-        conn = get_connection()
-        conn.close()
+        async with connection() as conn:
+            await conn.execute("SELECT 1")
         return {"status": "Database connection successful"}
-    except psycopg2.OperationalError as e:
+    except DB_UNAVAILABLE_ERRORS as e:
         raise HTTPException(status_code=503, detail=f"Database unavailable: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/db_pool", responses={
+    200: {"description": "Database connection pool statistics"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_db_pool():
+    try:
+        return pool_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/token_cache", responses={
+    200: {"description": "Verified token cache statistics"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_token_cache():
+    try:
+        return cache_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/rate_limit", responses={
+    200: {"description": "Rate limiter statistics (allowed / throttled requests)"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_rate_limit():
+    try:
+        return limiter_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/grader", responses={
+    200: {"description": "Automatic answer checking statistics"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_grader():
+    try:
+        return grader.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/revocation", responses={
+    200: {"description": "Stateless token revocation set statistics"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_revocation():
+    try:
+        return revocation_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/token_sweeper", responses={
+    200: {"description": "Expired token cleanup statistics (rows reclaimed)"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_token_sweeper():
+    try:
+        return sweeper_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/presence", responses={
+    200: {"description": "Team presence statistics (online teams, pending heartbeats)"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_presence():
+    try:
+        return presence_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/team_ws", responses={
+    200: {"description": "Team status websocket statistics (open sockets, pings, pong timeouts)"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_team_ws():
+    try:
+        return team_ws_hub.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/sequencer", responses={
+    200: {"description": "Next-task sequencing statistics (cached team progress)"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_sequencer():
+    try:
+        return sequencer_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/leaderboard", responses={
+    200: {"description": "Leaderboard state (freeze, rebuilds)"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_leaderboard():
+    try:
+        return leaderboard.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/response_cache", responses={
+    200: {"description": "Response cache statistics (hits, 304s, data version)"},
+    500: {"description": "Unexpected server error"}
+})
+def ping_response_cache():
+    try:
+        return response_cache_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
@@ -1,65 +1,67 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from routers.auth import decode_token
-from db_connect import get_connection
-from datetime import datetime, timedelta, timezone
-import psycopg2
+from db_connect import connection, DB_UNAVAILABLE_ERRORS
+from rate_limit import RateLimiter
+import scoreboard
+from scoreboard import board
+from grader import grader
+from sequencing import sequencer
 
 router = APIRouter(prefix="/team/tasks", tags=["team-tasks"])
 security = HTTPBearer()
 
-last_call_time = {}
+# Одна выдача задачи в 30 секунд на команду
+get_task_limiter = RateLimiter("get_task", 1, 30)
+
+async def team_payload(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    # Токен разбирается один раз на запрос
+    payload = await decode_token(credentials.credentials)
+    if payload.get("role") != "team":
+        raise HTTPException(status_code=401, detail="Only teams can access this endpoint")
+    return payload
 
 @router.get("/get_task", responses={
     200: {"description": "Next task for team"},
     401: {"description": "Unauthorized"},
     429: {"description": "Too many requests"},
-    404: {"description": "No tasks found"},
+    404: {"description": "No tasks left for this team"},
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def get_next_task_for_team(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+async def get_next_task_for_team(
+    response: Response,
+    payload: dict = Depends(team_payload)
 ):
-    token = credentials.credentials
-    payload = decode_token(token)
-
-    if payload.get("role") != "team":
-        raise HTTPException(status_code=401, detail="Only teams can access this endpoint")
-
-    team_id = payload["team_id"]
-
-    now = datetime.now(timezone.utc)
-    if team_id in last_call_time:
-        delta = now - last_call_time[team_id]
-        if delta < timedelta(seconds=30):
-            raise HTTPException(status_code=429, detail=f"Request allowed once every 30 seconds. Please wait {30 - int(delta.total_seconds())} sec.")
+    # Лимит расходуется только на выданную задачу: при 404 и ошибках запрос возвращается,
+    # и команда может сразу получить только что опубликованную задачу
+    team_key = str(payload["team_id"])
+    await get_task_limiter.hit(team_key, response)
 
+    # Следующая задача считается в памяти (sequencing.py); в БД — только текст по первичному ключу
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("SELECT task_id, qwestion FROM task ORDER BY task_id LIMIT 1")
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="No tasks found")
-        task_id, question = row
-
-        last_call_time[team_id] = now
-
-        return {
-            "task_id": task_id,
-            "question": question
-        }
-
-    except psycopg2.OperationalError as e:
+        await board.ensure_loaded()
+        row = None
+        task_id = sequencer.next_task(payload["team_id"])
+        if task_id is not None:
+            async with connection() as conn:
+                row = await conn.fetchrow("SELECT task_id, qwestion FROM task WHERE task_id = $1", task_id)
+    except DB_UNAVAILABLE_ERRORS as e:
+        await get_task_limiter.refund(team_key)
         raise HTTPException(status_code=503, detail=f"Database unavailable: {str(e)}")
     except Exception as e:
+        await get_task_limiter.refund(team_key)
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+    if not row:
+        await get_task_limiter.refund(team_key)
+        raise HTTPException(status_code=404, detail="No tasks left for this team")
+    task_id, question = row
+    return {
+        "task_id": task_id,
+        "question": question
+    }
 
 class SolutionInput(BaseModel):
     task_id: int
@@ -73,12 +75,12 @@ class SolutionInput(BaseModel):
     500: {"description": "Internal server error"},
     503: {"description": "Database unavailable"}
 })
-def answer_load(
+async def answer_load(
     data: SolutionInput,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = await decode_token(token)
 
     if payload.get("role") != "team":
         raise HTTPException(status_code=401, detail="Only teams can submit answers")
@@ -86,35 +88,32 @@ def answer_load(
     team_id = payload["team_id"]
 
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("SELECT 1 FROM task WHERE task_id = %s", (data.task_id,))
-        if cur.fetchone() is None:
-            raise HTTPException(status_code=400, detail="Task not found")
-
-        cur.execute("SELECT 1 FROM solution WHERE task_id = %s AND team_id = %s", (data.task_id, team_id))
-        if cur.fetchone():
-            raise HTTPException(status_code=409, detail="Solution already submitted")
-
-        cur.execute("SELECT MAX(solution_id) FROM solution")
-        max_id = cur.fetchone()[0] or 0
-        new_id = max_id + 1
-
-        cur.execute("""
-            INSERT INTO solution (solution_id, condition, answer, sent_at, approved_at, team_id, task_id)
-            VALUES (%s, %s, %s, NOW(), NULL, %s, %s)
-        """, (new_id, 'verification', data.answer, team_id, data.task_id))
-
-        conn.commit()
-        return {"message": "Solution successfully submitted", "solution_id": new_id}
-
-    except psycopg2.OperationalError:
+        async with connection() as conn:
+            # Одним запросом: вставляем, только если задача есть и решения ещё нет
+            row = await conn.fetchrow("""
+                INSERT INTO solution (condition, answer, sent_at, approved_at, team_id, task_id)
+                SELECT $1, $2, NOW(), NULL, $3, task_id FROM task
+                WHERE task_id = $4
+                ON CONFLICT (team_id, task_id) DO NOTHING
+                RETURNING solution_id, sent_at
+            """, 'verification', data.answer, team_id, data.task_id)
+            if row is None:
+                if await conn.fetchrow("SELECT 1 FROM task WHERE task_id = $1", data.task_id) is None:
+                    raise HTTPException(status_code=400, detail="Task not found")
+                raise HTTPException(status_code=409, detail="Solution already submitted")
+            new_id, sent_at = row
+
+            await scoreboard.record(conn, {
+                "type": "solution", "team_id": team_id, "task_id": data.task_id,
+                "condition": "verification", "sent_at": sent_at
+            })
+            # Проверка идёт в фоне; ответ команде не ждёт её результата
+            grader.submit(new_id, data.task_id, data.answer)
+            return {"message": "Solution successfully submitted", "solution_id": new_id}
+
+    except DB_UNAVAILABLE_ERRORS:
         raise HTTPException(status_code=503, detail="Database connection failed")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
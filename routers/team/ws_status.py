@@ -1,41 +1,220 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
+import json
+import os
+import time
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from routers.auth import decode_token
-from db_connect import get_connection
+from db_connect import DB_UNAVAILABLE_ERRORS
+from presence import presence
+import events
+import scoreboard
 
 router = APIRouter(prefix="/ws/team", tags=["team-websocket"])
 
-@router.websocket("/status")
-async def team_status_ws(websocket: WebSocket, token: str):
-    conn = None
-    team_id = None
+# Сервер сам шлёт "ping" сокету, молчавшему WS_PING_INTERVAL, и ждёт любой ответ (обычно "pong")
+# не дольше WS_PONG_TIMEOUT; иначе сокет закрывается и команда сразу становится отключённой.
+# Интервал с таймаутом должны укладываться в PRESENCE_TIMEOUT.
+#
+# Кроме ping сервер присылает события (JSON), чтобы команде не нужно было опрашивать get_task:
+#   {"type": "task_available", "task_ids": [...]}            — появились новые задачи
+#   {"type": "solutions", "tasks": [{"task_id", "status"}]}  — решение команды отправлено,
+#        проверено или удалено; status: pending / approve / reject / "" (можно отправлять снова)
+#   {"type": "resync"}  — события могли потеряться или изменилось всё сразу: перечитать get_task
+# Источник — события scoreboard, которые между воркерами ходят через LISTEN/NOTIFY.
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", 15))   # сек
+WS_PONG_TIMEOUT = float(os.getenv("WS_PONG_TIMEOUT", 10))     # сек
+CHECK_TICK = 1   # сек между проходами цикла ping
 
-    try:
-        await websocket.accept()
+# condition решения -> статус в событии для команды
+SOLUTION_STATUS = {"verification": "pending", "approve": "approve", "reject": "reject"}
 
-        # Проверка токена (асинхронная)
-        payload = await decode_token(token)
-        if payload.get("role") != "team":
-            await websocket.close()
+# Коды закрытия
+POLICY_VIOLATION = 1008
+INTERNAL_ERROR = 1011
+TRY_AGAIN_LATER = 1013
+
+
+class TeamSocket:
+    __slots__ = ("websocket", "team_id", "expires_at", "last_message", "ping_sent")
+
+    def __init__(self, websocket, team_id, expires_at):
+        self.websocket = websocket
+        self.team_id = team_id
+        self.expires_at = expires_at
+        self.last_message = time.monotonic()
+        self.ping_sent = None
+
+
+class StatusHub:
+    # Один цикл ping на процесс вместо таймера и задачи на каждый сокет: простаивающий
+    # сокет — это только его корутина receive и запись в self.sockets.
+    # События сериализуются один раз на сообщение и раскладываются по сокетам команды
+    def __init__(self):
+        self.sockets = set()
+        self._by_team = {}          # team_id -> {TeamSocket}
+        self._deliveries = set()    # незавершённые рассылки (держим ссылки на задачи)
+        self._task = None
+        self.pings = 0
+        self.timeouts = 0
+        self.pushed = 0
+
+    def add(self, websocket, team_id, expires_at):
+        sock = TeamSocket(websocket, team_id, expires_at)
+        self.sockets.add(sock)
+        self._by_team.setdefault(team_id, set()).add(sock)
+        self.start()
+        return sock
+
+    def discard(self, sock):
+        self.sockets.discard(sock)
+        team_socks = self._by_team.get(sock.team_id)
+        if team_socks is not None:
+            team_socks.discard(sock)
+            if not team_socks:
+                del self._by_team[sock.team_id]
+
+    # --- события для команд ---
+
+    def _push(self, socks, message):
+        if not socks:
             return
+        frame = json.dumps(message, ensure_ascii=False)
+        self.pushed += len(socks)
+        task = asyncio.get_running_loop().create_task(self._send_all(list(socks), frame))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _send_all(self, socks, text):
+        await asyncio.gather(*(self._send(sock, text) for sock in socks))
+
+    def _push_solutions(self, changes):
+        # changes — [(team_id, task_id, status)]; одно сообщение на команду
+        by_team = {}
+        for team_id, task_id, status in changes:
+            if team_id in self._by_team:
+                by_team.setdefault(team_id, []).append({"task_id": task_id, "status": status})
+        for team_id, tasks in by_team.items():
+            self._push(self._by_team[team_id], {"type": "solutions", "tasks": tasks})
+
+    def on_board_event(self, event):
+        if not self.sockets:
+            return
+        kind = event["type"]
+        if kind == "task":
+            self._push(self.sockets, {"type": "task_available", "task_ids": [event["task_id"]]})
+        elif kind == "tasks":
+            self._push(self.sockets, {"type": "task_available", "task_ids": event["task_ids"]})
+        elif kind in ("solution", "condition"):
+            self._push_solutions([(event["team_id"], event["task_id"], SOLUTION_STATUS.get(event["condition"], ""))])
+        elif kind == "conditions":
+            status = SOLUTION_STATUS.get(event["condition"], "")
+            self._push_solutions([(team_id, task_id, status) for team_id, task_id in event["pairs"]])
+        elif kind == "solution_removed":
+            self._push_solutions([(event["team_id"], event["task_id"], "")])
+        elif kind in ("task_removed", "tasks_cleared", "solutions_cleared"):
+            self.resync()
+
+    def resync(self):
+        if self.sockets:
+            self._push(self.sockets, {"type": "resync"})
 
-        team_id = payload["team_id"]
+    async def _send(self, sock, text):
+        try:
+            await sock.websocket.send_text(text)
+        except Exception:
+            pass   # сокет уже закрывается — его уберёт собственный обработчик
 
-        # Устанавливаем статус online
-        conn = await get_connection()
-        await conn.execute("UPDATE teams SET status = 'online' WHERE team_id = $1", team_id)
+    async def _close(self, sock, reason):
+        self.discard(sock)
+        try:
+            await sock.websocket.close(code=POLICY_VIOLATION, reason=reason)
+        except Exception:
+            pass
 
-        # Поддержка соединения
+    async def _tick(self):
+        now = time.monotonic()
+        wall = time.time()
+        jobs = []
+        for sock in list(self.sockets):
+            if sock.ping_sent is not None and now - sock.ping_sent > WS_PONG_TIMEOUT:
+                self.timeouts += 1
+                jobs.append(self._close(sock, "Pong timeout"))
+            elif sock.expires_at is not None and wall >= sock.expires_at:
+                jobs.append(self._close(sock, "Token expired"))
+            elif sock.ping_sent is None and now - sock.last_message >= WS_PING_INTERVAL:
+                sock.ping_sent = now
+                self.pings += 1
+                jobs.append(self._send(sock, "ping"))
+        if jobs:
+            await asyncio.gather(*jobs)
+
+    async def _run(self):
         while True:
-            await websocket.receive_text()
+            await asyncio.sleep(CHECK_TICK)
+            await self._tick()
 
-    except WebSocketDisconnect:
-        if team_id:
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
             try:
-                if conn is None:
-                    conn = await get_connection()
-                await conn.execute("UPDATE teams SET status = 'offline' WHERE team_id = $1", team_id)
-            except Exception:
-                pass  # Можно логировать при необходимости
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "sockets": len(self.sockets),
+            "ping_interval": WS_PING_INTERVAL,
+            "pong_timeout": WS_PONG_TIMEOUT,
+            "pings": self.pings,
+            "timeouts": self.timeouts,
+            "pushed": self.pushed,
+        }
+
+
+hub = StatusHub()
+scoreboard.on_event(hub.on_board_event)
+# Пока слушатель был отключён, события других воркеров могли потеряться
+events.on_connect(hub.resync)
+
+
+@router.websocket("/status")
+async def team_status_ws(websocket: WebSocket, token: str):
+    # Авторизация один раз, до accept: токен обычно уже в кеше, соединение с БД не нужно
+    # и на время жизни сокета не держится
+    try:
+        payload = await decode_token(token)
+    except HTTPException as e:
+        await websocket.close(code=POLICY_VIOLATION, reason=e.detail)
+        return
+    except DB_UNAVAILABLE_ERRORS:
+        await websocket.close(code=TRY_AGAIN_LATER, reason="Database unavailable")
+        return
+    except Exception:
+        await websocket.close(code=INTERNAL_ERROR)
+        return
+    if payload.get("role") != "team":
+        await websocket.close(code=POLICY_VIOLATION, reason="Team token required")
+        return
+    team_id = payload["team_id"]
+
+    await websocket.accept()
+    sock = hub.add(websocket, team_id, payload.get("exp"))
+    presence.connect(team_id)
+    try:
+        # Любое сообщение клиента — heartbeat и ответ на ping
+        while True:
+            await websocket.receive_text()
+            sock.last_message = time.monotonic()
+            sock.ping_sent = None
+            presence.heartbeat(team_id)
+    except WebSocketDisconnect:
+        pass
     finally:
-        if conn:
-            await conn.close()
+        hub.discard(sock)
+        presence.disconnect(team_id)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from scoreboard import board
+
+router = APIRouter(prefix="/ws", tags=["dashboard-websocket"])
+
+ONLINE_CHECK_INTERVAL = float(os.getenv("DASHBOARD_ONLINE_CHECK", 5))   # сек
+CLIENT_QUEUE_SIZE = int(os.getenv("DASHBOARD_CLIENT_QUEUE", 64))        # кадров на клиента
+
+RESYNC = object()   # маркер "отправить снимок" в очереди клиента
+
+
+class Client:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+
+    def push(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Медленный клиент: выбрасываем накопленное и отдаём ему свежий снимок
+            self.resync()
+
+    def resync(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC)
+
+
+class DashboardHub:
+    # Один цикл рассылки на процесс: каждая пачка дельт сериализуется один раз
+    # и раскладывается по очередям клиентов, без запросов к БД на клиента.
+    def __init__(self):
+        self.clients = set()
+        self._deltas = asyncio.Queue()
+        self._task = None
+        self._snapshot = (None, None)   # (seq, кадр) — общий для всех подключающихся
+        board.subscribe(self._on_delta)
+
+    def _on_delta(self, delta):
+        if self.clients:
+            self._deltas.put_nowait(delta)
+
+    def snapshot_frame(self):
+        seq, frame = self._snapshot
+        if seq != board.seq:
+            frame = json.dumps({
+                "type": "snapshot",
+                "seq": board.seq,
+                "teams": board.snapshot()
+            }, ensure_ascii=False)
+            self._snapshot = (board.seq, frame)
+        return frame
+
+    def _broadcast(self, frame):
+        for client in list(self.clients):
+            client.push(frame)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_check = loop.time() + ONLINE_CHECK_INTERVAL
+        while True:
+            try:
+                timeout = max(next_check - loop.time(), 0)
+                batch = [await asyncio.wait_for(self._deltas.get(), timeout)]
+            except asyncio.TimeoutError:
+                batch = []
+            if loop.time() >= next_check:
+                next_check = loop.time() + ONLINE_CHECK_INTERVAL
+                if board.loaded and self.clients:
+                    board.refresh_online()
+            while not self._deltas.empty():
+                batch.append(self._deltas.get_nowait())
+            if not batch or not self.clients:
+                continue
+            if any(delta["type"] == "resync" for delta in batch):
+                for client in list(self.clients):
+                    client.resync()
+                continue
+            self._broadcast(json.dumps(batch, ensure_ascii=False))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+hub = DashboardHub()
+
+
+async def _send_frames(client):
+    try:
+        while True:
+            frame = await client.queue.get()
+            if frame is RESYNC:
+                frame = hub.snapshot_frame()
+            await client.websocket.send_text(frame)
+    except Exception:
+        # Сокет сломан: сразу убираем клиента из рассылки и закрываем соединение,
+        # чтобы завершился и цикл приёма в обработчике
+        hub.clients.discard(client)
+        try:
+            await client.websocket.close(code=1011)
+        except Exception:
+            pass
+
+
+@router.websocket("/dashboard")
+async def dashboard_ws(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        await board.ensure_loaded()
+    except Exception:
+        await websocket.close(code=1011)
+        return
+
+    client = Client(websocket)
+    client.push(RESYNC)
+    hub.clients.add(client)
+    hub.start()
+    sender = asyncio.create_task(_send_frames(client))
+    try:
+        # Клиент присылает "resync", если заметил пропуск в seq
+        while True:
+            message = await websocket.receive_text()
+            if message == "resync":
+                client.resync()
+    except (WebSocketDisconnect, RuntimeError):
+        pass   # RuntimeError — сокет уже закрыт отправителем
+    finally:
+        hub.clients.discard(client)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
@@ -0,0 +1,251 @@
+import asyncio
+import bisect
+from datetime import datetime
+import events
+from presence import presence
+from db_connect import connection
+
+# Материализованное состояние дашборда: строится один раз из БД и дальше
+# обновляется событиями записи (локально и от других воркеров через events).
+CHANNEL = "scoreboard"
+
+
+def status_label(condition):
+    if condition == "approve":
+        return "зачет"
+    elif condition == "verification":
+        return "отправлен"
+    return "отклонено"
+
+
+class Scoreboard:
+    def __init__(self):
+        self.loaded = False
+        self._lock = asyncio.Lock()
+        self._pending = None       # события, пришедшие во время загрузки
+        self._listeners = []       # получатели дельт (push-канал дашборда)
+        self.seq = 0               # номер последней выпущенной дельты
+        self._reset()
+
+    def _reset(self):
+        self.team_ids = []         # отсортированы по team_id
+        self.logins = {}           # team_id -> login
+        self.team_by_login = {}    # login -> team_id
+        self.task_ids = []         # отсортированы по task_id
+        self.cells = {}            # team_id -> {task_id: (condition, sent_at)}
+        self.online = {}           # team_id -> последний отправленный статус подключения
+
+    async def load(self):
+        async with self._lock:
+            self._pending = []
+            try:
+                async with connection() as conn:
+                    async with conn.transaction(isolation="repeatable_read", readonly=True):
+                        teams = await conn.fetch("SELECT team_id, login FROM teams ORDER BY team_id")
+                        tasks = await conn.fetch("SELECT task_id FROM task ORDER BY task_id")
+                        solutions = await conn.fetch("SELECT team_id, task_id, condition, sent_at FROM solution")
+            except BaseException:
+                self._pending = None
+                raise
+            pending, self._pending = self._pending, None
+            self._reset()
+            for team_id, login in teams:
+                self.team_ids.append(team_id)
+                self.logins[team_id] = login
+                self.team_by_login[login] = team_id
+            self.task_ids = [row[0] for row in tasks]
+            for team_id, task_id, condition, sent_at in solutions:
+                self.set_solution(team_id, task_id, condition, sent_at)
+            # События идемпотентны, поэтому повтор уже учтённых в снимке безопасен
+            for event in pending:
+                self.apply(event)
+            self.online = self._online_states()
+            self.loaded = True
+            self._emit({"type": "resync"})
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _emit(self, delta):
+        self.seq += 1
+        delta["seq"] = self.seq
+        for listener in self._listeners:
+            listener(delta)
+
+    def _emit_cell(self, team_id, task_id):
+        if team_id not in self.logins:
+            return
+        cell = self.cells.get(team_id, {}).get(task_id)
+        self._emit({
+            "type": "cell",
+            "team": self.logins[team_id],
+            "task": str(task_id),
+            "status": status_label(cell[0]) if cell else ""
+        })
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.load()
+
+    # --- инкрементальные изменения ---
+
+    def add_team(self, team_id, login):
+        if team_id not in self.logins:
+            bisect.insort(self.team_ids, team_id)
+        self.logins[team_id] = login
+        self.team_by_login[login] = team_id
+
+    def add_task(self, task_id):
+        i = bisect.bisect_left(self.task_ids, task_id)
+        if i == len(self.task_ids) or self.task_ids[i] != task_id:
+            self.task_ids.insert(i, task_id)
+
+    def remove_task(self, task_id):
+        i = bisect.bisect_left(self.task_ids, task_id)
+        if i < len(self.task_ids) and self.task_ids[i] == task_id:
+            del self.task_ids[i]
+        for team_id in list(self.cells):
+            self.remove_solution(team_id, task_id)
+
+    def clear_tasks(self):
+        self.task_ids = []
+        self.clear_solutions()
+
+    def set_solution(self, team_id, task_id, condition, sent_at):
+        self.cells.setdefault(team_id, {})[task_id] = (condition, sent_at)
+
+    def set_condition(self, team_id, task_id, condition):
+        cell = self.cells.get(team_id, {}).get(task_id)
+        if cell is not None:
+            self.cells[team_id][task_id] = (condition, cell[1])
+
+    def remove_solution(self, team_id, task_id):
+        team_cells = self.cells.get(team_id)
+        if not team_cells or task_id not in team_cells:
+            return
+        del team_cells[task_id]
+        if not team_cells:
+            del self.cells[team_id]
+
+    def clear_solutions(self):
+        self.cells = {}
+
+    def apply(self, event):
+        if self._pending is not None:
+            self._pending.append(event)
+            return
+        kind = event["type"]
+        if kind == "team":
+            self.add_team(event["team_id"], event["login"])
+        elif kind == "task":
+            self.add_task(event["task_id"])
+        elif kind == "tasks":
+            for task_id in event["task_ids"]:
+                self.add_task(task_id)
+        elif kind == "task_removed":
+            self.remove_task(event["task_id"])
+        elif kind == "tasks_cleared":
+            self.clear_tasks()
+        elif kind == "solution":
+            sent_at = event["sent_at"]
+            if isinstance(sent_at, str):
+                sent_at = datetime.fromisoformat(sent_at)
+            self.set_solution(event["team_id"], event["task_id"], event["condition"], sent_at)
+        elif kind == "condition":
+            self.set_condition(event["team_id"], event["task_id"], event["condition"])
+        elif kind == "conditions":
+            for team_id, task_id in event["pairs"]:
+                self.set_condition(team_id, task_id, event["condition"])
+        elif kind == "solution_removed":
+            self.remove_solution(event["team_id"], event["task_id"])
+        elif kind == "solutions_cleared":
+            self.clear_solutions()
+        else:
+            return
+        if not self.loaded:
+            return
+        if kind == "conditions":
+            for team_id, task_id in event["pairs"]:
+                self._emit_cell(team_id, task_id)
+        elif kind in ("solution", "condition", "solution_removed"):
+            self._emit_cell(event["team_id"], event["task_id"])
+        else:
+            # Изменилась структура таблицы (команды/задачи) — клиентам проще взять снимок
+            self._emit({"type": "resync"})
+
+    # --- чтение ---
+
+    def _online_states(self):
+        online = presence.online_teams()
+        return {
+            team_id: "подключена" if team_id in online else "отключена"
+            for team_id in self.team_ids
+        }
+
+    def refresh_online(self):
+        # Вызывается при подключении/отключении команды и периодически push-каналом:
+        # отключение по таймауту heartbeat'а само никого не оповещает
+        states = self._online_states()
+        for team_id, status in states.items():
+            if self.online.get(team_id) != status:
+                self._emit({"type": "online", "team": self.logins[team_id], "status": status})
+        self.online = states
+
+    def snapshot(self):
+        states = self._online_states()
+        result = []
+        for team_id in self.team_ids:
+            team_cells = self.cells.get(team_id, {})
+            files = {}
+            for task_id in self.task_ids:
+                cell = team_cells.get(task_id)
+                files[str(task_id)] = status_label(cell[0]) if cell else ""
+            result.append({
+                "team_name": self.logins[team_id],
+                "status": states[team_id],
+                "files": files
+            })
+        return result
+
+
+board = Scoreboard()
+_event_listeners = []   # получают каждое событие как есть, свои и с других воркеров
+
+
+def on_event(listener):
+    _event_listeners.append(listener)
+
+
+def _dispatch(event):
+    board.apply(event)
+    for listener in _event_listeners:
+        try:
+            listener(event)
+        except Exception:
+            pass
+
+
+async def record(conn, event):
+    # Вызывается обработчиками после успешной записи в БД
+    _dispatch(event)
+    await events.publish(conn, CHANNEL, event)
+
+
+def _on_event(event):
+    _dispatch(event)
+
+
+async def _on_connect():
+    # Пока шина была недоступна, события других воркеров могли потеряться
+    if board.loaded:
+        await board.load()
+
+
+def _on_presence():
+    if board.loaded:
+        board.refresh_online()
+
+
+events.subscribe(CHANNEL, _on_event)
+presence.subscribe(_on_presence)
+events.on_connect(_on_connect)
@@ -0,0 +1,136 @@
+import bisect
+import math
+import os
+import zlib
+from dotenv import load_dotenv
+import scoreboard
+from scoreboard import board
+
+load_dotenv()
+
+# Какую задачу выдать команде следующей. Задача закрыта для команды, если по ней уже есть
+# решение (повторно отправить нельзя — UNIQUE (team_id, task_id)), поэтому следующая — первая
+# задача без решения в порядке этой команды. Порядок задач и решения берутся из состояния
+# дашборда (scoreboard.board), которое и так держится в памяти и обновляется событиями всех
+# воркеров; на команду хранится только битовая маска закрытых задач и курсор.
+#   TASK_ORDER=sequential — по task_id, одинаково для всех;
+#   TASK_ORDER=shuffled   — у каждой команды своя перестановка (аффинная: i -> (a*i + b) mod n,
+#                           a и b из team_id), чтобы команды не решали одно и то же одновременно.
+TASK_ORDER = os.getenv("TASK_ORDER", "sequential")
+
+
+class TeamProgress:
+    __slots__ = ("mask", "cursor", "a", "b")
+
+    def __init__(self, mask, a, b):
+        self.mask = mask     # бит i — по задаче board.task_ids[i] есть решение
+        self.cursor = 0      # до этой позиции в порядке команды всё закрыто
+        self.a = a
+        self.b = b
+
+
+class Sequencer:
+    def __init__(self, order=TASK_ORDER):
+        self.order = order
+        self._teams = {}     # team_id -> TeamProgress; сбрасывается при изменении списка задач
+        self._n = None       # число задач, для которого построены маски
+        self.hits = 0
+        self.builds = 0
+        self.resets = 0
+
+    def reset(self):
+        self._teams = {}
+        self._n = None
+        self.resets += 1
+
+    def _permutation(self, team_id, n):
+        if self.order != "shuffled" or n < 2:
+            return 1, 0
+        h = zlib.crc32(str(team_id).encode())
+        a = h % n or 1
+        while math.gcd(a, n) != 1:
+            a = a % (n - 1) + 1
+        return a, (h >> 16) % n
+
+    def _progress(self, team_id):
+        n = len(board.task_ids)
+        if self._n != n:
+            self._teams = {}
+            self._n = n
+        progress = self._teams.get(team_id)
+        if progress is None:
+            positions = {task_id: i for i, task_id in enumerate(board.task_ids)}
+            mask = 0
+            for task_id in board.cells.get(team_id, ()):
+                if task_id in positions:
+                    mask |= 1 << positions[task_id]
+            progress = TeamProgress(mask, *self._permutation(team_id, n))
+            self._teams[team_id] = progress
+            self.builds += 1
+        return progress
+
+    def next_task(self, team_id):
+        # -> task_id или None, если задачи кончились. Курсор только растёт, пока решения
+        # не удаляют, поэтому в среднем проверяется одна-две позиции
+        progress = self._progress(team_id)
+        n = self._n
+        a, b, mask = progress.a, progress.b, progress.mask
+        j = progress.cursor
+        while j < n:
+            i = (a * j + b) % n
+            if not mask >> i & 1:
+                break
+            j += 1
+        progress.cursor = j
+        self.hits += 1
+        return board.task_ids[(a * j + b) % n] if j < n else None
+
+    def _position(self, task_id):
+        i = bisect.bisect_left(board.task_ids, task_id)
+        return i if i < len(board.task_ids) and board.task_ids[i] == task_id else None
+
+    def _set(self, team_id, task_id, solved):
+        progress = self._teams.get(team_id)
+        if progress is None:
+            return   # маска ещё не строилась — построится из board при первом запросе
+        i = self._position(task_id)
+        if i is None:
+            return
+        if solved:
+            progress.mask |= 1 << i
+        else:
+            progress.mask &= ~(1 << i)
+            progress.cursor = 0
+
+    def on_board_event(self, event):
+        kind = event["type"]
+        if kind == "solution":
+            self._set(event["team_id"], event["task_id"], True)
+        elif kind == "solution_removed":
+            self._set(event["team_id"], event["task_id"], False)
+        elif kind in ("task", "tasks", "task_removed", "tasks_cleared", "solutions_cleared"):
+            # Позиции задач в масках сдвинулись — маски перестроятся лениво из board
+            self.reset()
+
+    def on_board_delta(self, delta):
+        if delta["type"] == "resync":
+            self.reset()
+
+    def stats(self):
+        return {
+            "order": self.order,
+            "teams": len(self._teams),
+            "tasks": self._n,
+            "hits": self.hits,
+            "builds": self.builds,
+            "resets": self.resets,
+        }
+
+
+sequencer = Sequencer()
+scoreboard.on_event(sequencer.on_board_event)
+board.subscribe(sequencer.on_board_delta)
+
+
+def sequencer_stats():
+    return sequencer.stats()
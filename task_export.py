@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+import os
+import zlib
+from dotenv import load_dotenv
+from db_connect import connection
+
+load_dotenv()
+
+# Потоковая выгрузка таблицы solution для /admin/tasks/export: строки идут из серверного
+# курсора пачками прямо в StreamingResponse, весь результат в памяти не собирается.
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", 1000))   # строк на один кусок ответа
+COLUMNS = ["solution_id", "team_id", "login", "task_id", "condition", "answer", "sent_at", "approved_at"]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def build_query(task_id=None, team_id=None, condition=None, sent_from=None, sent_to=None):
+    filters = []
+    args = []
+    for sql, value in (
+        ("s.task_id = ${}", task_id),
+        ("s.team_id = ${}", team_id),
+        ("s.condition = ${}", condition),
+        ("s.sent_at >= ${}", sent_from),
+        ("s.sent_at < ${}", sent_to),
+    ):
+        if value is not None:
+            args.append(value)
+            filters.append(sql.format(len(args)))
+    query = """
+        SELECT s.solution_id, s.team_id, t.login, s.task_id, s.condition, s.answer, s.sent_at, s.approved_at
+        FROM solution s
+        JOIN teams t ON t.team_id = s.team_id
+    """
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    return query + " ORDER BY s.solution_id", args
+
+
+def _ndjson(rows):
+    return "".join(
+        json.dumps({
+            "solution_id": r[0],
+            "team_id": r[1],
+            "login": r[2],
+            "task_id": r[3],
+            "condition": r[4],
+            "answer": r[5],
+            "sent_at": r[6].isoformat(),
+            "approved_at": r[7].isoformat() if r[7] else None
+        }, ensure_ascii=False) + "\n"
+        for r in rows
+    )
+
+
+def _csv(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    for r in rows:
+        writer.writerow([r[0], r[1], r[2], r[3], r[4], r[5], r[6].isoformat(), r[7].isoformat() if r[7] else ""])
+    return buffer.getvalue()
+
+
+async def iter_export(fmt, query, args):
+    # Соединение держится, пока клиент читает ответ; при обрыве генератор закрывается и отдаёт его в пул
+    async with connection() as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            cursor = await conn.cursor(query, *args)
+            first = True
+            while True:
+                rows = await cursor.fetch(EXPORT_BATCH)
+                if fmt == "csv":
+                    chunk = _csv(rows, header=first)
+                else:
+                    chunk = _ndjson(rows)
+                first = False
+                if chunk:
+                    yield chunk.encode("utf-8")
+                if len(rows) < EXPORT_BATCH:
+                    break
+
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)   # 31 — формат gzip
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
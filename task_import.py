@@ -0,0 +1,230 @@
+import codecs
+import csv
+import json
+import re
+
+# Потоковый разбор тела запроса /admin/tasks/bulk_load: строки отдаются по мере
+# поступления байтов, весь файл в памяти не собирается.
+MAX_FIELD_LENGTH = 255   # task.answer и task.qwestion — varchar(255)
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def detect_format(content_type):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/json", ""):
+        return "json"
+    raise ImportFormatError(f"Unsupported content type: {content_type}")
+
+
+async def _iter_text(stream):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in stream:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _iter_lines(stream):
+    buffer = ""
+    async for text in _iter_text(stream):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+class _ArrayScanner:
+    # Ищет конец текущего элемента массива — запятую или ] вне строк и скобок. Состояние
+    # сохраняется между кусками тела, поэтому каждый символ просматривается один раз
+    def __init__(self):
+        self.stack = []        # открытые [ и { внутри элемента
+        self.in_string = False
+        self.escape = False    # последний символ куска — обратный слэш внутри строки
+        self.broken = False    # скобки внутри элемента не сошлись
+
+    def find(self, buffer, i):
+        # -> (позиция границы или None, докуда просмотрено)
+        if self.escape and i < len(buffer):
+            self.escape = False
+            i += 1
+        while True:
+            match = (STRING_SPECIAL if self.in_string else ARRAY_SPECIAL).search(buffer, i)
+            if match is None:
+                return None, len(buffer)
+            i = match.start()
+            ch = buffer[i]
+            if self.in_string:
+                if ch == "\\":
+                    if i + 1 == len(buffer):
+                        self.escape = True
+                        return None, len(buffer)
+                    i += 2
+                    continue
+                self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "[{":
+                self.stack.append(ch)
+            elif ch == "," and not self.stack:
+                return i, i
+            elif ch == "]" and not self.stack:
+                return i, i
+            elif ch in "]}":
+                opener = "[" if ch == "]" else "{"
+                if opener in self.stack:
+                    while self.stack.pop() != opener:
+                        self.broken = True
+                else:
+                    self.broken = True
+            i += 1
+
+
+STRING_SPECIAL = re.compile(r'["\\]')
+ARRAY_SPECIAL = re.compile(r'[\[\]{}",]')
+MAX_ELEMENT_LENGTH = 64 * 1024   # символов; длиннее валидная задача быть не может
+_decoder = json.JSONDecoder()
+
+
+async def _iter_json_array(stream):
+    # Отдаёт (элемент, ошибка). Элемент разбирается только когда за ним уже пришла запятая
+    # или ], поэтому число на стыке кусков тела не распадётся на несколько строк,
+    # а испорченный элемент станет ошибкой своей строки, а не всего файла
+    buffer = ""
+    pos = 0          # начало текущего элемента
+    scan = 0         # докуда текущий элемент просмотрен
+    scanner = _ArrayScanner()
+    started = False
+    finished = False
+    async for text in _iter_text(stream):
+        if finished:
+            if text.strip():
+                raise ImportFormatError("Unexpected data after JSON array")
+            continue
+        buffer += text
+        while True:
+            if not started:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                if buffer[pos] != "[":
+                    raise ImportFormatError("Expected JSON array")
+                started = True
+                pos = scan = pos + 1
+            if scan == pos:
+                # Быстрый путь: целый элемент, за которым уже видна запятая или ]
+                start = pos
+                while start < len(buffer) and buffer[start] in " \t\r\n":
+                    start += 1
+                try:
+                    item, end = _decoder.raw_decode(buffer, start)
+                except ValueError:
+                    end = None
+                if end is not None:
+                    while end < len(buffer) and buffer[end] in " \t\r\n":
+                        end += 1
+                    if end == len(buffer):
+                        break   # ждём разделитель: "123" может оказаться началом "12345"
+                    if buffer[end] in ",]":
+                        yield item, None
+                        pos = scan = end + 1
+                        if buffer[end] == "]":
+                            finished = True
+                            break
+                        continue
+            boundary, scan = scanner.find(buffer, scan)
+            if boundary is None:
+                if scan - pos > MAX_ELEMENT_LENGTH:
+                    raise ImportFormatError(f"JSON array element is longer than {MAX_ELEMENT_LENGTH} characters")
+                break
+            element = buffer[pos:boundary].strip()
+            closing = buffer[boundary] == "]"
+            if element:
+                if scanner.broken:
+                    yield None, "Invalid JSON: unbalanced brackets"
+                else:
+                    try:
+                        yield json.loads(element), None
+                    except ValueError as e:
+                        yield None, f"Invalid JSON: {e}"
+            elif not closing:
+                yield None, "Invalid JSON: empty array element"
+            pos = scan = boundary + 1
+            scanner = _ArrayScanner()
+            if closing:
+                finished = True
+                break
+        buffer = buffer[pos:]
+        scan -= pos
+        pos = 0
+        if finished and buffer.strip():
+            raise ImportFormatError("Unexpected data after JSON array")
+    if not finished:
+        raise ImportFormatError("Unterminated JSON array")
+
+
+def validate(item):
+    if not isinstance(item, dict):
+        return None, "Row must be an object with 'question' and 'answer'"
+    question = item.get("question")
+    answer = item.get("answer")
+    for field, value in (("question", question), ("answer", answer)):
+        if not isinstance(value, str) or not value.strip():
+            return None, f"Field '{field}' is required"
+        if len(value) > MAX_FIELD_LENGTH:
+            return None, f"Field '{field}' is longer than {MAX_FIELD_LENGTH} characters"
+    return (question, answer), None
+
+
+async def iter_rows(stream, fmt):
+    # Отдаёт (номер строки, (question, answer) или None, ошибка или None)
+    if fmt == "json":
+        row_no = 0
+        async for item, error in _iter_json_array(stream):
+            row_no += 1
+            if error is not None:
+                yield row_no, None, error
+                continue
+            yield (row_no, *validate(item))
+    elif fmt == "ndjson":
+        row_no = 0
+        async for line in _iter_lines(stream):
+            row_no += 1
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                yield row_no, None, f"Invalid JSON: {e}"
+                continue
+            yield (row_no, *validate(item))
+    else:
+        header = None
+        row_no = 0
+        async for line in _iter_lines(stream):
+            if not line.strip():
+                continue
+            # Многострочные значения в кавычках не поддерживаются: одна строка файла — одна задача
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip().lower() for name in values]
+                if "question" not in header or "answer" not in header:
+                    raise ImportFormatError("CSV header must contain 'question' and 'answer'")
+                continue
+            row_no += 1
+            if len(values) != len(header):
+                yield row_no, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            yield (row_no, *validate(dict(zip(header, values))))
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+import events
+
+load_dotenv()
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 300))          # сек; не дольше expires_at токена
+INVALIDATION_CHANNEL = "auth_token_invalidate"
+
+
+def token_key(token):
+    # В памяти храним не сам токен, а его хеш
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenCache:
+    def __init__(self, max_size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = True
+        self._entries = OrderedDict()    # key -> (payload, valid_until)
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, token):
+        if not self.enabled:
+            self._stats["misses"] += 1
+            return None
+        key = token_key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        payload, valid_until = entry
+        if time.time() >= valid_until:
+            del self._entries[key]
+            self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return dict(payload)
+
+    def put(self, token, payload, expires_at):
+        if not self.enabled or self.max_size <= 0:
+            return
+        valid_until = min(time.time() + self.ttl, expires_at.timestamp())
+        key = token_key(token)
+        self._entries[key] = (dict(payload), valid_until)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, key):
+        if self._entries.pop(key, None) is not None:
+            self._stats["invalidations"] += 1
+
+    def invalidate_team(self, team_id):
+        keys = [key for key, (payload, _) in self._entries.items() if payload.get("team_id") == team_id]
+        for key in keys:
+            self.invalidate(key)
+
+    def clear(self):
+        self._stats["invalidations"] += len(self._entries)
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+cache = TokenCache()
+
+
+def _on_invalidate(message):
+    if "token" in message:
+        cache.invalidate(message["token"])
+    elif "team_id" in message:
+        cache.invalidate_team(message["team_id"])
+    else:
+        cache.clear()
+
+
+async def revoke_token(conn, token):
+    key = token_key(token)
+    cache.invalidate(key)
+    await events.publish(conn, INVALIDATION_CHANNEL, {"token": key})
+
+
+async def revoke_team(conn, team_id):
+    cache.invalidate_team(team_id)
+    await events.publish(conn, INVALIDATION_CHANNEL, {"team_id": team_id})
+
+
+def _on_connect():
+    cache.clear()
+    cache.enabled = True
+
+
+def _on_disconnect():
+    # Без канала инвалидации кеш может разойтись с другими воркерами
+    cache.enabled = False
+    cache.clear()
+
+
+events.subscribe(INVALIDATION_CHANNEL, _on_invalidate)
+if events.EVENTS_ENABLED:
+    # До подключения слушателя кешу верить нельзя
+    cache.enabled = False
+    events.on_connect(_on_connect)
+    events.on_disconnect(_on_disconnect)
+
+
+def cache_stats():
+    return cache.stats()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from db_connect import connection
+import token_cache
+import revocation
+
+load_dotenv()
+
+# Обслуживание auth_tokens: каждый вход добавляет строку, поэтому истёкшие токены
+# удаляются в фоне небольшими пачками (короткие транзакции, без долгих блокировок),
+# а у команды не может быть больше TOKEN_MAX_PER_TEAM активных токенов.
+TOKEN_SWEEP_INTERVAL = float(os.getenv("TOKEN_SWEEP_INTERVAL", 300))   # сек между проходами
+TOKEN_SWEEP_BATCH = int(os.getenv("TOKEN_SWEEP_BATCH", 1000))          # строк за одно удаление
+TOKEN_MAX_PER_TEAM = int(os.getenv("TOKEN_MAX_PER_TEAM", 20))          # 0 — без ограничения
+BATCH_PAUSE = 0.05   # сек между пачками, чтобы не забирать соединения у запросов
+
+
+class TokenSweeper:
+    def __init__(self):
+        self._task = None
+        self.runs = 0
+        self.reclaimed = 0          # всего удалено строк
+        self.last_reclaimed = 0
+        self.last_run_at = None
+        self.last_duration = None
+        self.failed_runs = 0
+
+    async def sweep(self):
+        started = time.monotonic()
+        deleted = 0
+        while True:
+            async with connection() as conn:
+                # SKIP LOCKED: несколько воркеров могут чистить одновременно, не мешая друг другу
+                result = await conn.execute("""
+                    DELETE FROM auth_tokens
+                    WHERE token_id IN (
+                        SELECT token_id FROM auth_tokens
+                        WHERE expires_at < NOW()
+                        LIMIT $1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                """, TOKEN_SWEEP_BATCH)
+            count = int(result.split()[-1])
+            deleted += count
+            if count < TOKEN_SWEEP_BATCH:
+                break
+            await asyncio.sleep(BATCH_PAUSE)
+        self.runs += 1
+        self.reclaimed += deleted
+        self.last_reclaimed = deleted
+        self.last_run_at = time.time()
+        self.last_duration = round(time.monotonic() - started, 3)
+        return deleted
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed_runs += 1
+            await asyncio.sleep(TOKEN_SWEEP_INTERVAL)
+
+    def start(self):
+        if self._task is None and TOKEN_SWEEP_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "running": self._task is not None,
+            "interval": TOKEN_SWEEP_INTERVAL,
+            "batch": TOKEN_SWEEP_BATCH,
+            "max_per_team": TOKEN_MAX_PER_TEAM,
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "reclaimed": self.reclaimed,
+            "last_reclaimed": self.last_reclaimed,
+            "last_run_at": self.last_run_at,
+            "last_duration": self.last_duration,
+        }
+
+
+sweeper = TokenSweeper()
+
+
+async def enforce_team_limit(conn, team_id):
+    # Вызывается после выдачи нового токена: самые старые активные токены сверх лимита отзываются
+    if TOKEN_MAX_PER_TEAM <= 0:
+        return 0
+    rows = await conn.fetch("""
+        UPDATE auth_tokens SET revoked_at = NOW()
+        WHERE token_id IN (
+            SELECT token_id FROM auth_tokens
+            WHERE team_id = $1 AND revoked_at IS NULL AND expires_at > NOW()
+            ORDER BY token_id DESC
+            OFFSET $2
+        )
+        RETURNING token, expires_at
+    """, team_id, TOKEN_MAX_PER_TEAM)
+    for token, _ in rows:
+        await token_cache.revoke_token(conn, token)
+    await revocation.revoke(conn, rows)
+    return len(rows)
+
+
+def sweeper_stats():
+    return sweeper.stats()
@@ -0,0 +1,657 @@
+import argparse
+import asyncio
+import glob
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+import asyncpg
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from bench_seed import load, reset, seed, team_login
+
+# Нагрузочный бенчмарк API. Скрипт поднимает отдельную базу (своя БД на сервере из POSTGRES_*,
+# например docker-compose db, или временный кластер initdb), применяет миграции, заполняет её
+# генератором bench_seed.py, запускает uvicorn и гоняет сценарии дня конкурса:
+#   login       — все команды входят одновременно
+#   polling     — команды опрашивают get_task (большая часть ответов — 429 лимита)
+#   submit      — волна ответов в answer_load
+#   spectators  — зрители дашборда с If-None-Match и рейтинг
+#   moderation  — администратор листает решения задачи и проверяет их пачками
+#   mixed       — polling, spectators, moderation и поток ответов одновременно
+# Для каждого запроса — p50/p95/p99, среднее, максимум, RPS и коды ответов. Результат пишется
+# в bench_results/<время>-<коммит>.json; --compare сравнивает с прошлым прогоном.
+#
+#   docker-compose up -d db
+#   python toys/bench_api.py --teams 500 --tasks 50 --solutions 5000 --compare latest
+#   python toys/bench_api.py --pg throwaway --pg-bin /usr/lib/postgresql/15/bin
+#
+# Клиент нагрузки работает в этом же процессе; на одной машине с сервером он отнимает у него
+# процессор, поэтому сравнивать стоит прогоны на одинаковом железе и с одинаковыми параметрами.
+SCENARIOS = ("login", "polling", "submit", "spectators", "moderation", "mixed")
+RESULTS_DIR = os.path.join(ROOT, "bench_results")
+MODERATION_BATCH = 50
+
+
+# --- HTTP/1.1 клиент с keep-alive: без зависимостей и с малыми накладными расходами ---
+
+class Connection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        # -> (статус, заголовки, тело)
+        payload = b"" if body is None else json.dumps(body).encode()
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(payload)}"]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        raw = ("\r\n".join(lines) + "\r\n\r\n").encode() + payload
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+                attempt = 1   # свежее соединение: повторять нечего
+            try:
+                self.writer.write(raw)
+                await self.writer.drain()
+                return await self._response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Сервер закрыл простаивавшее keep-alive соединение — пробуем ещё раз на новом
+                self.close()
+                if attempt:
+                    raise
+
+    async def _response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            body = b"".join(chunks)
+        else:
+            body = b""
+        if headers.get("connection") == "close":
+            self.close()
+        return status, headers, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+# --- замеры ---
+
+def percentile(values, p):
+    if not values:
+        return None
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}    # запрос -> [сек]
+        self.statuses = {}     # запрос -> Counter(статус); 0 — ошибка соединения
+        self.started = time.monotonic()
+
+    async def call(self, conn, name, method, path, body=None, headers=None):
+        started = time.monotonic()
+        try:
+            status, response_headers, response_body = await conn.request(method, path, body, headers)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            conn.close()
+            status, response_headers, response_body = 0, {}, b""
+        self.latencies.setdefault(name, []).append(time.monotonic() - started)
+        self.statuses.setdefault(name, Counter())[status] += 1
+        return status, response_headers, response_body
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        result = {}
+        for name, values in self.latencies.items():
+            values.sort()
+            ms = lambda value: round(value * 1000, 2)
+            result[name] = {
+                "count": len(values),
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": ms(percentile(values, 50)),
+                "p95_ms": ms(percentile(values, 95)),
+                "p99_ms": ms(percentile(values, 99)),
+                "mean_ms": ms(sum(values) / len(values)),
+                "max_ms": ms(values[-1]),
+                "statuses": {str(status): count for status, count in sorted(self.statuses[name].items())},
+            }
+        return {"seconds": round(elapsed, 2), "requests": result}
+
+
+# --- сценарии ---
+
+class Context:
+    def __init__(self, args, data, host, port):
+        self.args = args
+        self.data = data
+        self.host = host
+        self.port = port
+        self.rng = random.Random(args.rng_seed)
+        self.tokens = {}            # team_id -> токен команды
+        self.admin_token = None
+
+    def connection(self):
+        return Connection(self.host, self.port)
+
+    def team_headers(self, team_id):
+        return {"Authorization": f"Bearer {self.tokens[team_id]}"}
+
+    def admin_headers(self):
+        return {"Authorization": f"Bearer {self.admin_token}"}
+
+
+async def run_workers(count, worker):
+    await asyncio.gather(*(worker(i) for i in range(count)))
+
+
+async def drain(queue_items, concurrency, job):
+    # Очередь заданий, которую разбирают concurrency соединений
+    queue = asyncio.Queue()
+    for item in queue_items:
+        queue.put_nowait(item)
+
+    async def worker(_):
+        while not queue.empty():
+            await job(queue.get_nowait())
+
+    await run_workers(concurrency, worker)
+
+
+async def until(deadline, interval, step):
+    # Повторяет step() до deadline; пауза — interval с разбросом, чтобы клиенты не шли строем
+    while time.monotonic() < deadline:
+        await step()
+        await asyncio.sleep(max(min(interval * random.uniform(0.5, 1.5), deadline - time.monotonic()), 0))
+
+
+async def login_admin(ctx, rec):
+    conn = ctx.connection()
+    status, _, body = await rec.call(conn, "POST /auth/login/admin", "POST", "/auth/login/admin",
+                                     {"login": "admin", "password": ctx.args.admin_password})
+    conn.close()
+    if status != 200:
+        raise RuntimeError(f"вход администратора: {status} {body[:200]!r}")
+    ctx.admin_token = json.loads(body)["token"]
+
+
+async def scenario_login(ctx, rec):
+    connections = {}
+
+    async def job(i):
+        conn = connections.setdefault(id(asyncio.current_task()), ctx.connection())
+        while True:
+            status, headers, body = await rec.call(conn, "POST /auth/login", "POST", "/auth/login",
+                                                   {"login": team_login(i), "password": ctx.args.password})
+            if status != 503:
+                break
+            # Пул хеширования паролей занят — клиент ждёт Retry-After, как фронтенд
+            await asyncio.sleep(float(headers.get("retry-after", 1)))
+        if status == 200:
+            response = json.loads(body)
+            ctx.tokens[response["team_id"]] = response["token"]
+
+    await drain(range(1, len(ctx.data["team_ids"]) + 1), ctx.args.concurrency, job)
+    for conn in connections.values():
+        conn.close()
+
+
+async def ensure_tokens(ctx, rec):
+    if not ctx.tokens:
+        await scenario_login(ctx, Recorder())
+    if ctx.admin_token is None:
+        await login_admin(ctx, Recorder())
+
+
+def polling_worker(ctx, rec, deadline):
+    team_ids = list(ctx.tokens)
+
+    async def worker(i):
+        team_id = team_ids[i % len(team_ids)]
+        conn = ctx.connection()
+
+        async def step():
+            await rec.call(conn, "GET /team/tasks/get_task", "GET", "/team/tasks/get_task",
+                           headers=ctx.team_headers(team_id))
+
+        await until(deadline, ctx.args.poll_interval, step)
+        conn.close()
+
+    return worker
+
+
+def spectator_worker(ctx, rec, deadline):
+    async def worker(i):
+        conn = ctx.connection()
+        etag = None
+
+        async def step():
+            nonlocal etag
+            # Каждый пятый запрос зрителя — рейтинг, остальные — дашборд
+            if random.random() < 0.2:
+                await rec.call(conn, "GET /dashboard/leaderboard", "GET", "/dashboard/leaderboard?limit=50")
+                return
+            headers = {"If-None-Match": etag} if etag else {}
+            status, response_headers, _ = await rec.call(conn, "GET /dashboard/", "GET", "/dashboard/",
+                                                         headers=headers)
+            if status == 200:
+                etag = response_headers.get("etag")
+
+        await until(deadline, ctx.args.spectator_interval, step)
+        conn.close()
+
+    return worker
+
+
+def moderation_worker(ctx, rec, deadline):
+    task_ids = ctx.data["task_ids"]
+
+    async def worker(i):
+        conn = ctx.connection()
+        headers = ctx.admin_headers()
+
+        async def step():
+            task_id = ctx.rng.choice(task_ids)
+            status, _, body = await rec.call(
+                conn, "GET /admin/tasks/task_solutions_short", "GET",
+                f"/admin/tasks/task_solutions_short?task_id={task_id}&shape=columns", headers=headers)
+            if status != 200:
+                return
+            pending = [row[1] for row in json.loads(body)["rows"] if row[2] == "verification"]
+            if pending:
+                pairs = [{"team_id": team_id, "task_id": task_id} for team_id in pending[:MODERATION_BATCH]]
+                await rec.call(conn, "POST /admin/tasks/answers/moderate", "POST", "/admin/tasks/answers/moderate",
+                               {"action": ctx.rng.choice(("approve", "reject")), "pairs": pairs}, headers)
+
+        await until(deadline, ctx.args.moderation_interval, step)
+        conn.close()
+
+    return worker
+
+
+def submissions(ctx, per_team):
+    # Задания (team_id, task_id, answer) на ещё не решённые командой задачи; половина ответов верные
+    solved = ctx.data["solved"]
+    answers = ctx.data["answers"]
+    jobs = []
+    for team_id in ctx.tokens:
+        free = [task_id for task_id in ctx.data["task_ids"] if task_id not in solved[team_id]]
+        for task_id in free[:per_team]:
+            solved[team_id].add(task_id)
+            answer = answers[task_id] if ctx.rng.random() < 0.5 else "wrong"
+            jobs.append((team_id, task_id, answer))
+    ctx.rng.shuffle(jobs)
+    return jobs
+
+
+async def submit(ctx, rec, conn, job):
+    team_id, task_id, answer = job
+    await rec.call(conn, "POST /team/tasks/answer_load", "POST", "/team/tasks/answer_load",
+                   {"task_id": task_id, "answer": answer}, ctx.team_headers(team_id))
+
+
+async def scenario_submit(ctx, rec):
+    connections = {}
+
+    async def job(item):
+        conn = connections.setdefault(id(asyncio.current_task()), ctx.connection())
+        await submit(ctx, rec, conn, item)
+
+    await drain(submissions(ctx, ctx.args.burst), ctx.args.concurrency, job)
+    for conn in connections.values():
+        conn.close()
+
+
+async def scenario_polling(ctx, rec):
+    deadline = time.monotonic() + ctx.args.duration
+    await run_workers(min(ctx.args.pollers, len(ctx.tokens)), polling_worker(ctx, rec, deadline))
+
+
+async def scenario_spectators(ctx, rec):
+    deadline = time.monotonic() + ctx.args.duration
+    await run_workers(ctx.args.spectators, spectator_worker(ctx, rec, deadline))
+
+
+async def scenario_moderation(ctx, rec):
+    deadline = time.monotonic() + ctx.args.duration
+    await run_workers(ctx.args.moderators, moderation_worker(ctx, rec, deadline))
+
+
+async def scenario_mixed(ctx, rec):
+    deadline = time.monotonic() + ctx.args.duration
+    jobs = submissions(ctx, 1)
+
+    async def submitter(i):
+        # Ответы идут равномерно на протяжении всего сценария
+        conn = ctx.connection()
+        mine = jobs[i::ctx.args.submitters]
+        interval = ctx.args.duration / max(len(mine), 1)
+        for item in mine:
+            if time.monotonic() >= deadline:
+                break
+            await submit(ctx, rec, conn, item)
+            await asyncio.sleep(interval)
+        conn.close()
+
+    await asyncio.gather(
+        run_workers(min(ctx.args.pollers, len(ctx.tokens)), polling_worker(ctx, rec, deadline)),
+        run_workers(ctx.args.spectators, spectator_worker(ctx, rec, deadline)),
+        run_workers(ctx.args.moderators, moderation_worker(ctx, rec, deadline)),
+        run_workers(ctx.args.submitters, submitter),
+    )
+
+
+SCENARIO_FUNCTIONS = {
+    "login": scenario_login,
+    "polling": scenario_polling,
+    "submit": scenario_submit,
+    "spectators": scenario_spectators,
+    "moderation": scenario_moderation,
+    "mixed": scenario_mixed,
+}
+
+
+# --- база и сервер ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pg_tool(args, name):
+    path = os.path.join(args.pg_bin, name) if args.pg_bin else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise SystemExit(f"не найден {name}: укажите --pg-bin")
+    return path
+
+
+def start_throwaway_cluster(args):
+    # Временный кластер: только unix-сокет в своём каталоге, без пароля, удаляется после прогона
+    directory = tempfile.mkdtemp(prefix="contest-bench-")
+    data_dir = os.path.join(directory, "data")
+    port = free_port()
+    subprocess.run([pg_tool(args, "initdb"), "-D", data_dir, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([pg_tool(args, "pg_ctl"), "-D", data_dir, "-w", "-l", os.path.join(directory, "postgres.log"),
+                    "-o", f"-k {directory} -p {port} -c listen_addresses='' -c fsync=off", "start"],
+                   check=True, stdout=subprocess.DEVNULL)
+    env = {"POSTGRES_HOST": directory, "POSTGRES_PORT": str(port), "POSTGRES_USER": "postgres",
+           "POSTGRES_PASSWORD": "", "POSTGRES_DB": "postgres"}
+
+    def stop():
+        subprocess.run([pg_tool(args, "pg_ctl"), "-D", data_dir, "-m", "fast", "stop"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return env, stop
+
+
+async def create_database(env, name):
+    conn = await asyncpg.connect(database=env["POSTGRES_DB"], user=env["POSTGRES_USER"],
+                                 password=env["POSTGRES_PASSWORD"] or None,
+                                 host=env["POSTGRES_HOST"], port=int(env["POSTGRES_PORT"]))
+    try:
+        await conn.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        await conn.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await conn.close()
+
+
+def start_server(args, env, port):
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"]
+    return subprocess.Popen(command, cwd=ROOT, env=env)
+
+
+async def wait_ready(host, port, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"сервер завершился с кодом {server.returncode}")
+        conn = Connection(host, port)
+        try:
+            status, _, _ = await conn.request("GET", "/ping/bd_connect")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            conn.close()
+        await asyncio.sleep(0.5)
+    raise SystemExit("сервер не ответил за отведённое время")
+
+
+async def server_stats(ctx):
+    stats = {}
+    conn = ctx.connection()
+    for name in ("db_pool", "token_cache", "rate_limit", "grader", "response_cache"):
+        try:
+            status, _, body = await conn.request("GET", f"/ping/{name}")
+        except OSError:
+            break
+        if status == 200:
+            stats[name] = json.loads(body)
+    conn.close()
+    return stats
+
+
+# --- результаты ---
+
+def git_commit():
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def save_results(results, directory):
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, f"{stamp}-{results['commit']}{'-dirty' if results['dirty'] else ''}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def find_baseline(compare, directory, current):
+    if compare != "latest":
+        return compare
+    previous = sorted(path for path in glob.glob(os.path.join(directory, "*.json")) if path != current)
+    return previous[-1] if previous else None
+
+
+def print_summary(results):
+    for scenario, summary in results["scenarios"].items():
+        print(f"\n{scenario} ({summary['seconds']} с)")
+        print(f"  {'запрос':40s} {'кол-во':>7s} {'RPS':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s}  коды")
+        for name, row in summary["requests"].items():
+            codes = " ".join(f"{status}:{count}" for status, count in row["statuses"].items())
+            print(f"  {name:40s} {row['count']:7d} {row['rps']:7.1f} {row['p50_ms']:8.1f} "
+                  f"{row['p95_ms']:8.1f} {row['p99_ms']:8.1f}  {codes}")
+
+
+def compare_results(current, baseline, threshold):
+    # -> число регрессий: p95/p99 выросли или RPS упал больше чем на threshold процентов
+    print(f"\nСравнение с {baseline['commit']} ({baseline['started_at']}), порог {threshold:.0f}%")
+    regressions = 0
+    for scenario, summary in current["scenarios"].items():
+        old_summary = baseline["scenarios"].get(scenario)
+        if old_summary is None:
+            continue
+        for name, row in summary["requests"].items():
+            old = old_summary["requests"].get(name)
+            if old is None:
+                continue
+            changes = []
+            for key, worse_if_higher in (("p95_ms", True), ("p99_ms", True), ("rps", False)):
+                if not old[key]:
+                    continue
+                delta = (row[key] - old[key]) / old[key] * 100
+                bad = delta > threshold if worse_if_higher else delta < -threshold
+                regressions += bad
+                changes.append(f"{key} {old[key]:.1f}->{row[key]:.1f} ({delta:+.0f}%){' ❌' if bad else ''}")
+            print(f"  {scenario:11s} {name:40s} " + ", ".join(changes))
+    return regressions
+
+
+# --- запуск ---
+
+async def run(args):
+    env = dict(os.environ)
+    stop_cluster = None
+    if args.url is None:
+        if args.pg == "throwaway":
+            cluster_env, stop_cluster = start_throwaway_cluster(args)
+            env.update(cluster_env)
+        env.setdefault("POSTGRES_HOST", "localhost")
+        env.setdefault("POSTGRES_PORT", "5432")
+        env.setdefault("POSTGRES_PASSWORD", "")
+    server = None
+    try:
+        if args.url is None:
+            await create_database(env, args.db_name)
+            env["POSTGRES_DB"] = args.db_name
+            os.environ.update({key: env[key] for key in
+                               ("POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_HOST", "POSTGRES_PORT")})
+            from migrate import migrate
+            migrate()
+        from db_connect import async_connect_params
+        conn = await asyncpg.connect(**async_connect_params())
+        try:
+            if args.url is None:
+                await reset(conn)
+                print(f"Заполнение: {args.teams} команд, {args.tasks} задач, {args.solutions} решений")
+                data = await seed(conn, args.teams, args.tasks, args.solutions, args.password,
+                                  args.admin_password, rng_seed=args.rng_seed)
+            else:
+                # Сервер уже запущен на базе, заполненной toys/bench_seed.py
+                data = await load(conn)
+        finally:
+            await conn.close()
+
+        if args.url is None:
+            host, port = "127.0.0.1", free_port()
+            env.update(dict(item.split("=", 1) for item in args.env))
+            env["DB_MIGRATE_ON_STARTUP"] = "0"
+            env.setdefault("JWT_SECRET", os.urandom(32).hex())
+            server = start_server(args, env, port)
+            await wait_ready(host, port, server)
+        else:
+            host, _, port = args.url.removeprefix("http://").rstrip("/").partition(":")
+            port = int(port or 80)
+
+        ctx = Context(args, data, host, port)
+        commit, dirty = git_commit()
+        results = {
+            "commit": commit,
+            "dirty": dirty,
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "params": {key: value for key, value in vars(args).items() if key not in ("compare", "results_dir")},
+            "machine": {"python": platform.python_version(), "cpus": os.cpu_count(), "platform": platform.platform()},
+            "scenarios": {},
+        }
+        for name in args.scenarios:
+            if name != "login":
+                await ensure_tokens(ctx, Recorder())
+            print(f"▶ {name}")
+            rec = Recorder()
+            await SCENARIO_FUNCTIONS[name](ctx, rec)
+            results["scenarios"][name] = rec.summary()
+        results["server"] = await server_stats(ctx)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if stop_cluster is not None:
+            stop_cluster()
+
+    print_summary(results)
+    path = save_results(results, args.results_dir)
+    print(f"\nРезультат: {os.path.relpath(path, ROOT)}")
+    if args.compare:
+        baseline_path = find_baseline(args.compare, args.results_dir, path)
+        if baseline_path is None:
+            print("Нет прошлого прогона для сравнения")
+            return 0
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        print("✅ Без регрессий" if not regressions else f"❌ Регрессий: {regressions}")
+        return 1 if regressions else 0
+    return 0
+
+
+def scenario_list(value):
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк API конкурса")
+    parser.add_argument("--pg", choices=("env", "throwaway"), default="env",
+                        help="env — сервер PostgreSQL из POSTGRES_* (docker-compose db); throwaway — временный initdb")
+    parser.add_argument("--pg-bin", help="каталог initdb/pg_ctl для --pg throwaway")
+    parser.add_argument("--db-name", default="contest_bench", help="база бенчмарка; пересоздаётся при каждом прогоне")
+    parser.add_argument("--url", help="уже запущенный сервер на базе из POSTGRES_*, заполненной toys/bench_seed.py")
+    parser.add_argument("--workers", type=int, default=1, help="воркеров uvicorn")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="переменная окружения сервера")
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--solutions", type=int, default=5000)
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--admin-password", default="admin")
+    parser.add_argument("--scenarios", type=scenario_list, default=list(SCENARIOS),
+                        help="через запятую: " + ",".join(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=20, help="сек на сценарии с опросом")
+    parser.add_argument("--concurrency", type=int, default=100, help="соединений для login и submit")
+    parser.add_argument("--burst", type=int, default=2, help="ответов на команду в сценарии submit")
+    parser.add_argument("--pollers", type=int, default=500, help="команд, опрашивающих get_task")
+    parser.add_argument("--poll-interval", type=float, default=5)
+    parser.add_argument("--spectators", type=int, default=200)
+    parser.add_argument("--spectator-interval", type=float, default=2)
+    parser.add_argument("--moderators", type=int, default=2)
+    parser.add_argument("--moderation-interval", type=float, default=0.5)
+    parser.add_argument("--submitters", type=int, default=20, help="соединений с ответами в mixed")
+    parser.add_argument("--rng-seed", type=int, default=1)
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="файл прошлого прогона или latest")
+    parser.add_argument("--threshold", type=float, default=20, help="допустимое ухудшение, %%")
+    sys.exit(asyncio.run(run(parser.parse_args())))
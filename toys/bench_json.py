@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fast_json
+
+# Сравнение сериализации большого списка решений (как /admin/tasks/task_solutions):
+# прежний путь — dict на строку с .isoformat() и stdlib json, против fast_json в обеих формах.
+#
+#   python toys/bench_json.py --rows 10000 50000
+#
+# Замер (orjson 3.8): 10 000 строк — прежний путь ~52 мс, objects ~13 мс, columns ~4 мс;
+# 50 000 — ~270 / ~70 / ~20 мс. Без orjson выигрыш даёт только отказ от dict на строку.
+
+COLUMNS = ["solution_id", "team_id", "status", "answer", "sent_at", "approved_at"]
+
+
+def make_rows(n):
+    now = datetime.now(timezone.utc)
+    return [
+        (i, i % 500, "approve" if i % 3 else "verification", f"answer text {i}",
+         now + timedelta(seconds=i), None if i % 2 else now)
+        for i in range(n)
+    ]
+
+
+def legacy(rows):
+    result = [{
+        "solution_id": row[0],
+        "team_id": row[1],
+        "status": row[2],
+        "answer": row[3],
+        "sent_at": row[4].isoformat(),
+        "approved_at": row[5].isoformat() if row[5] else None
+    } for row in rows]
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, len(body)
+
+
+def main(args):
+    print(f"orjson: {'да' if fast_json.orjson is not None else 'нет (stdlib json)'}")
+    for n in args.rows:
+        rows = make_rows(n)
+        cases = [
+            ("dict + isoformat + json (прежний)", lambda: legacy(rows)),
+            ("fast_json, shape=objects", lambda: fast_json.dumps(fast_json.rows_content(COLUMNS, rows))),
+            ("fast_json, shape=columns", lambda: fast_json.dumps(fast_json.rows_content(COLUMNS, rows, "columns"))),
+        ]
+        print(f"\n{n} строк")
+        base = None
+        for name, fn in cases:
+            ms, size = timed(fn, args.repeat)
+            base = base or ms
+            print(f"  {name:36s} {ms:8.1f} мс  x{base / ms:4.1f}  {size / 1024:8.0f} КБ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение сериализации больших списков")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5, help="повторов, берётся лучший")
+    main(parser.parse_args())
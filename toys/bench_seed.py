@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+import asyncpg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import passwords
+from db_connect import async_connect_params
+
+# Генератор данных для бенчмарка: N команд, M задач и K решений в пустой (или очищаемой)
+# базе. Все команды получают логины bench00001... и один пароль — хеш считается один раз,
+# но вход каждой команды всё равно стоит полной проверки KDF, как в день конкурса.
+# Часть задач проверяется автоматически (exact), остальные ждут модерации.
+#
+#   python toys/bench_seed.py --teams 500 --tasks 50 --solutions 5000 --reset
+#
+# --reset очищает teams, task, solution и auth_tokens — только для отдельной базы бенчмарка.
+LOGIN_FORMAT = "bench{:05d}"
+SOLUTION_CONDITIONS = ("verification", "approve", "reject")
+
+
+def team_login(i):
+    return LOGIN_FORMAT.format(i)
+
+
+def task_answer(i):
+    return f"answer-{i}"
+
+
+async def reset(conn):
+    await conn.execute("TRUNCATE solution, auth_tokens, task, teams RESTART IDENTITY CASCADE")
+
+
+async def seed(conn, teams, tasks, solutions, password="bench", admin_password="admin",
+               auto_check=0.5, rng_seed=1):
+    # -> {"team_ids", "task_ids", "answers": {task_id: answer}, "solved": {team_id: set(task_id)}}
+    rng = random.Random(rng_seed)
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(hours=2)
+
+    # scrypt/PBKDF2 считается один раз в процессе бенчмарка, не в пуле сервера
+    team_hash, team_salt = passwords.make_hash(password)
+    admin_hash, admin_salt = passwords.make_hash(admin_password)
+    await conn.execute("""
+        INSERT INTO teams (updated_at, login, password_hash, password_salt, created_at)
+        VALUES (NOW(), 'admin', $1, $2, NOW())
+        ON CONFLICT (login) DO NOTHING
+    """, admin_hash, admin_salt)
+    await conn.copy_records_to_table(
+        "teams", columns=["updated_at", "login", "password_hash", "password_salt", "created_at"],
+        records=[(now, team_login(i), team_hash, team_salt, now) for i in range(1, teams + 1)]
+    )
+    team_ids = [row[0] for row in await conn.fetch(
+        "SELECT team_id FROM teams WHERE login LIKE 'bench%' ORDER BY team_id")]
+
+    await conn.copy_records_to_table(
+        "task", columns=["answer", "qwestion", "created_at", "check_mode"],
+        records=[
+            (task_answer(i), f"Бенчмарк: задача {i}", start + timedelta(seconds=i),
+             "exact" if rng.random() < auto_check else "manual")
+            for i in range(1, tasks + 1)
+        ]
+    )
+    answers = dict(await conn.fetch("SELECT task_id, answer FROM task ORDER BY task_id"))
+    task_ids = list(answers)
+
+    # Каждая команда решает задачи примерно по порядку, поэтому решения сгущаются в начале
+    # списка задач — как в настоящем конкурсе
+    solutions = min(solutions, len(team_ids) * len(task_ids))
+    solved = {team_id: set() for team_id in team_ids}
+    records = []
+    while len(records) < solutions:
+        team_id = rng.choice(team_ids)
+        free = [task_id for task_id in task_ids if task_id not in solved[team_id]]
+        if not free:
+            continue
+        task_id = free[min(int(rng.expovariate(0.3)), len(free) - 1)]
+        solved[team_id].add(task_id)
+        condition = rng.choice(SOLUTION_CONDITIONS)
+        sent_at = start + timedelta(seconds=rng.uniform(0, 7000))
+        approved_at = sent_at + timedelta(seconds=30) if condition == "approve" else None
+        records.append((condition, answers[task_id], sent_at, approved_at, team_id, task_id))
+    await conn.copy_records_to_table(
+        "solution", columns=["condition", "answer", "sent_at", "approved_at", "team_id", "task_id"],
+        records=records
+    )
+    await conn.execute("ANALYZE teams, task, solution")
+    return {"team_ids": team_ids, "task_ids": task_ids, "answers": answers, "solved": solved}
+
+
+async def load(conn):
+    # То же, что возвращает seed(), для уже заполненной базы
+    team_ids = [row[0] for row in await conn.fetch(
+        "SELECT team_id FROM teams WHERE login LIKE 'bench%' ORDER BY team_id")]
+    answers = dict(await conn.fetch("SELECT task_id, answer FROM task ORDER BY task_id"))
+    solved = {team_id: set() for team_id in team_ids}
+    for team_id, task_id in await conn.fetch("SELECT team_id, task_id FROM solution"):
+        if team_id in solved:
+            solved[team_id].add(task_id)
+    return {"team_ids": team_ids, "task_ids": list(answers), "answers": answers, "solved": solved}
+
+
+async def main(args):
+    conn = await asyncpg.connect(**async_connect_params())
+    try:
+        if args.reset:
+            await reset(conn)
+        elif await conn.fetchval("SELECT EXISTS (SELECT 1 FROM teams WHERE login LIKE 'bench%')"):
+            print("❌ В базе уже есть команды бенчмарка: запустите с --reset")
+            return 1
+        data = await seed(conn, args.teams, args.tasks, args.solutions, args.password,
+                          args.admin_password, args.auto_check, args.rng_seed)
+    finally:
+        await conn.close()
+    print(f"✅ Команд {len(data['team_ids'])}, задач {len(data['task_ids'])}, "
+          f"решений {sum(map(len, data['solved'].values()))}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Данные для бенчмарка API (база из POSTGRES_*)")
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--solutions", type=int, default=5000)
+    parser.add_argument("--password", default="bench", help="пароль всех команд")
+    parser.add_argument("--admin-password", default="admin")
+    parser.add_argument("--auto-check", type=float, default=0.5, help="доля задач с автопроверкой")
+    parser.add_argument("--rng-seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="очистить таблицы перед заполнением")
+    sys.exit(asyncio.run(main(parser.parse_args())))
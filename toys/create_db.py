@@ -1,79 +1,20 @@
 import os
-import psycopg2
+import sys
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения из .env
 load_dotenv()
 
-DB_NAME = os.getenv("POSTGRES_DB")
-DB_USER = os.getenv("POSTGRES_USER")
-DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
-DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+# Схема описана миграциями в migrations/, скрипт просто применяет их
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from migrate import migrate
 
-SQL_SCRIPT = """
-CREATE TABLE IF NOT EXISTS "auth_tokens" (
-    "token_id" bigint NOT NULL,
-    "token" varchar(255) NOT NULL UNIQUE,
-    "expires_at" timestamp with time zone NOT NULL,
-    "team_id" bigint NOT NULL,
-    PRIMARY KEY ("token_id")
-);
-
-CREATE TABLE IF NOT EXISTS "solution" (
-    "solution_id" bigint NOT NULL,
-    "condition" varchar(255) NOT NULL,
-    "answer" varchar(255) NOT NULL,
-    "sent_at" timestamp with time zone NOT NULL,
-    "approved_at" timestamp with time zone,
-    "team_id" bigint NOT NULL,
-    "task_id" bigint NOT NULL,
-    PRIMARY KEY ("solution_id")
-);
-
-CREATE TABLE IF NOT EXISTS "teams" (
-    "team_id" bigint NOT NULL,
-    "updated_at" timestamp with time zone NOT NULL,
-    "login" varchar(255) NOT NULL UNIQUE,
-    "password_hash" varchar(255) NOT NULL,
-    "password_salt" varchar(255) NOT NULL,
-    "created_at" timestamp with time zone NOT NULL,
-    PRIMARY KEY ("team_id")
-);
-
-CREATE TABLE IF NOT EXISTS "task" (
-    "task_id" bigint NOT NULL,
-    "answer" varchar(255) NOT NULL,
-    "qwestion" varchar(255) NOT NULL,
-    "created_at" timestamp with time zone NOT NULL,
-    PRIMARY KEY ("task_id")
-);
-
--- Внешние ключи
-ALTER TABLE "auth_tokens" 
-    ADD CONSTRAINT "auth_tokens_fk3" FOREIGN KEY ("team_id") REFERENCES "teams"("team_id");
-
-ALTER TABLE "solution" 
-    ADD CONSTRAINT "solution_fk5" FOREIGN KEY ("team_id") REFERENCES "teams"("team_id");
-
-ALTER TABLE "solution" 
-    ADD CONSTRAINT "solution_fk6" FOREIGN KEY ("task_id") REFERENCES "task"("task_id");
-"""
 
 def create_db():
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        conn.autocommit = True
-        cur = conn.cursor()
-        cur.execute(SQL_SCRIPT)
-        cur.close()
-        conn.close()
+        applied = migrate()
+        for version, name in applied:
+            print(f"✅ Применена миграция {version:04d}_{name}")
         print("✅ База данных успешно создана и инициализирована.")
     except Exception as e:
         print("❌ Ошибка при подключении к базе данных или выполнении запроса:", e)
@@ -1,8 +1,11 @@
-import hashlib, os
+import os, sys
+
+# Хеш в том же формате, что и у сервера (passwords.py, параметры из .env)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from passwords import make_hash
 
-salt = os.urandom(16).hex()
 password = "UsFEvZXZomWorB3eJVbA"
-hash_ = hashlib.sha256((password + salt).encode()).hexdigest()
+hash_, salt = make_hash(password)
 
 print("salt:", salt)
 print("hash:", hash_)
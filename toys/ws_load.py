@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+import urllib.request
+import websockets
+
+# Нагрузочная проверка /ws/team/status: один воркер uvicorn должен держать 5000 простаивающих
+# командных сокетов, укладываясь в бюджет памяти. Скрипт открывает сокеты, отвечает на ping
+# сервера, держит их --hold секунд и сравнивает прирост RSS процесса сервера с --budget-mb.
+#
+#   uvicorn main:app --workers 1 --ws wsproto --ws-per-message-deflate false --ws-ping-interval 0 &
+#   python toys/ws_load.py --login team1 --password ... --pid $!
+#
+# Бюджет по умолчанию — 150 МБ на 5000 сокетов (замерено ~26 КБ на сокет). Клиенту нужен
+# пакет websockets; обоим процессам — ulimit -n больше числа сокетов.
+
+
+def http_json(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def hold_socket(url, stats, opened, stop):
+    try:
+        async with websockets.connect(url, ping_interval=None, open_timeout=30) as ws:
+            stats["connected"] += 1
+            opened.release()
+            receiver = asyncio.ensure_future(_answer_pings(ws, stats))
+            await asyncio.wait([receiver, asyncio.ensure_future(stop.wait())],
+                               return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                stats["dropped"] += 1
+            receiver.cancel()
+    except Exception as e:
+        stats["failed"] += 1
+        stats["last_error"] = repr(e)
+        opened.release()
+
+
+async def _answer_pings(ws, stats):
+    async for message in ws:
+        if message == "ping":
+            stats["pings"] += 1
+            await ws.send("pong")
+
+
+async def main(args):
+    base = args.url.rstrip("/")
+    token = args.token or http_json(f"{base}/auth/login", {"login": args.login, "password": args.password})["token"]
+    ws_url = base.replace("http", "ws", 1) + f"/ws/team/status?token={token}"
+
+    before = rss_mb(args.pid) if args.pid else None
+    stats = {"connected": 0, "failed": 0, "dropped": 0, "pings": 0, "last_error": None}
+    opened = asyncio.Semaphore(args.concurrency)
+    stop = asyncio.Event()
+    tasks = []
+    started = time.monotonic()
+    for _ in range(args.sockets):
+        await opened.acquire()
+        tasks.append(asyncio.create_task(hold_socket(ws_url, stats, opened, stop)))
+    while stats["connected"] + stats["failed"] < args.sockets:
+        await asyncio.sleep(0.1)
+    connect_time = time.monotonic() - started
+    print(f"открыто {stats['connected']}/{args.sockets} сокетов за {connect_time:.1f} с, ошибок {stats['failed']}")
+    if stats["last_error"]:
+        print("последняя ошибка:", stats["last_error"])
+
+    await asyncio.sleep(args.hold)
+    presence = http_json(f"{base}/ping/presence")
+    after = rss_mb(args.pid) if args.pid else None
+    print(f"через {args.hold:.0f} с: на сервере {presence['connections']} сокетов, "
+          f"ping получено {stats['pings']}, оборвано {stats['dropped']}")
+
+    ok = stats["failed"] == 0 and stats["dropped"] == 0 and presence["connections"] >= stats["connected"]
+    if before is not None:
+        growth = after - before
+        per_socket = growth * 1024 / max(stats["connected"], 1)
+        print(f"RSS сервера: {before:.1f} -> {after:.1f} МБ (+{growth:.1f} МБ, {per_socket:.1f} КБ на сокет), "
+              f"бюджет {args.budget_mb:.0f} МБ")
+        ok = ok and growth <= args.budget_mb
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    print("✅ OK" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочная проверка командного websocket")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--login")
+    parser.add_argument("--password")
+    parser.add_argument("--token", help="готовый токен команды вместо --login/--password")
+    parser.add_argument("--sockets", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200, help="одновременных рукопожатий")
+    parser.add_argument("--hold", type=float, default=40, help="сек удержания (больше WS_PING_INTERVAL)")
+    parser.add_argument("--pid", type=int, help="pid процесса сервера для замера RSS")
+    parser.add_argument("--budget-mb", type=float, default=150, help="допустимый прирост RSS сервера")
+    args = parser.parse_args()
+    if not args.token and not (args.login and args.password):
+        parser.error("нужен --token или --login и --password")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from routers.team.ws_status import StatusHub
+
+# Проверка рассылки событий командным сокетам без сервера и БД: одно событие conditions
+# (пачка грейдера или массовая модерация) затрагивает две команды — кадр должна получить каждая.
+#
+#   python toys/ws_push_check.py
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, text):
+        self.frames.append(json.loads(text))
+
+
+async def main():
+    hub = StatusHub()
+    hub.start = lambda: None   # цикл ping здесь не нужен
+    sockets = {team_id: FakeWebSocket() for team_id in (1, 2, 3)}
+    for team_id, websocket in sockets.items():
+        hub.add(websocket, team_id, None)
+
+    hub.on_board_event({"type": "conditions", "condition": "approve", "pairs": [[1, 10], [2, 10], [2, 11]]})
+    await asyncio.gather(*hub._deliveries)
+
+    expected = {
+        1: [{"type": "solutions", "tasks": [{"task_id": 10, "status": "approve"}]}],
+        2: [{"type": "solutions", "tasks": [{"task_id": 10, "status": "approve"},
+                                            {"task_id": 11, "status": "approve"}]}],
+        3: [],
+    }
+    ok = True
+    for team_id, frames in expected.items():
+        got = sockets[team_id].frames
+        if got != frames:
+            ok = False
+            print(f"❌ команда {team_id}: ожидалось {frames}, получено {got}")
+    print("✅ OK" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))